@@ -8,19 +8,50 @@ import time
 import logging
 import json
 import argparse
+from concurrent.futures import ThreadPoolExecutor
 from fem_api_client import FEMAPIClient
 from flcore_params import FlcoreParams, FlcoreDataset, FlcoreOpalVariables
 from generate_flcore_report import FLCoreLogParser, HTMLReportGenerator
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 
 
 API_PREFIX = 'https://fl.bsc.es/dt4h-fem/API/v1'
 JOB_TIMEOUT = 60 * 5  # 5 minutes
 POLLING_INTERVAL = 2  # seconds
+MAX_POLLING_INTERVAL = 30  # seconds
+POLLING_BACKOFF = 1.5
 REQUEST_TIMEOUT = 700  # seconds
-FINISH_WAIT = 22  # seconds
+FINISH_WAIT = 22  # seconds, upper bound of the wait for results to settle
+SETTLE_POLLING_INTERVAL = 1  # seconds
 FILES_TIMEOUT = 120  # seconds
 
+
+def _generate_report(log_file: str, report_file: str) -> str:
+    '''Parse the server log and write the HTML report, run in a worker thread'''
+    parser = FLCoreLogParser(log_file)
+    data = parser.parse_logs()
+    generator = HTMLReportGenerator(data)
+    generator.generate_html(report_file)
+    return report_file
+
+def _has_output(files: dict, node: str, name: str) -> bool:
+    '''Whether the execution file list already holds the output file name of node'''
+    node_files = files.get(node, {}).get('files') or ()
+    return name in node_files or f"{node}_{name}" in node_files
+
+def _outputs_ready(files: dict, server_node: str, client_nodes: list[str]) -> bool:
+    '''Whether the server log and every client log are listed for the execution'''
+    return (
+        'user_id' not in files
+        and _has_output(files, server_node, 'log_server.txt')
+        and all(_has_output(files, node, 'log_client.txt') for node in client_nodes)
+    )
+
 def dt4h_flcore(
         server_node: str = 'BSC',
         client_node_list: list[str] = None,
@@ -33,7 +64,10 @@ def dt4h_flcore(
         target_label: str = None,
         job_timeout: int = JOB_TIMEOUT,
         finish_wait: int = FINISH_WAIT,
-        files_timeout: int = FILES_TIMEOUT
+        files_timeout: int = FILES_TIMEOUT,
+        polling_interval: float = POLLING_INTERVAL,
+        max_polling_interval: float = MAX_POLLING_INTERVAL,
+        polling_backoff: float = POLLING_BACKOFF
     ) -> dict:
     """ Run the DT4H demonstrator tool on the specified nodes."""
     if not tool_name:
@@ -42,175 +76,216 @@ def dt4h_flcore(
     if not server_node:
         return {'status': 'failure', 'message': 'Server node must be provided'}
 
-    logging.info(f"Starting DT4H {tool_name} demonstrator")
-    logging.info(f"Using FEM API: {API_PREFIX}")
+    logging.info("Starting DT4H %s demonstrator", tool_name)
+    logging.info("Using FEM API: %s", API_PREFIX)
+
+    with FEMAPIClient(API_PREFIX) as api_client:
+        # Authenticate with the FEM API
+        # Use token or user/pass as fallback
+        api_client.authenticate(
+            authtoken=os.environ.get('FEM_ACCESS_TOKEN'),
+            user=os.environ.get('FEM_USER_NAME'),
+            password=os.environ.get('FEM_USER_PASSWORD'),
+            # Reuse of user/password tokens across runs is opt-in
+            use_cache=os.environ.get('FEM_TOKEN_CACHE', '').lower() in ('1', 'true', 'yes')
+        )
 
-    api_client = FEMAPIClient(API_PREFIX)
-    # Authenticate with the FEM API
-    # Use token or user/pass as fallback
-    api_client.authenticate(
-        authtoken=os.environ.get('FEM_ACCESS_TOKEN'),
-        user=os.environ.get('FEM_USER_NAME'),
-        password=os.environ.get('FEM_USER_PASSWORD')
-    )
+        if api_client.token  is None:
+            logging.error("Failed to obtain access token")
+            return {'status': 'failure', 'message': 'Failed to obtain access token'}
 
-    if api_client.token  is None:
-        logging.error("Failed to obtain access token")
-        return {'status': 'failure', 'message': 'Failed to obtain access token'}
-
-# Input datasets and automatic client node selection
-    flcore_dataset = FlcoreDataset(input_dataset_path=input_dataset_path)
-
-    if not client_node_list:
-        client_node_list = flcore_dataset.get_clients()
-        logging.info(f"Client nodes taken from data manifest. ({', '.join(client_node_list)})")
-        if not client_node_list or len(client_node_list) == 0:
-            return {'status': 'failure', 'message': 'No client nodes found in data manifest.'}
-
-    # Health check. Node selection
-    if not health_check_path:
-        logging.info("Health check is disabled, proceeding without it")
-        api_client.server_node = server_node
-        if client_node_list and isinstance(client_node_list, str):
-            api_client.client_nodes = client_node_list.split(',')   
-        else:
-            api_client.client_nodes = client_node_list
-    else:
-        api_client.server_node = None
-        logging.info("Checking server health")
-        api_client.node_heartbeat(server_node)
-        if 'state' in api_client.health_sites_data[server_node] and \
-                api_client.health_sites_data[server_node]['state'] == 'running':
+    # Input datasets and automatic client node selection
+        flcore_dataset = FlcoreDataset(input_dataset_path=input_dataset_path)
+
+        if not client_node_list:
+            client_node_list = flcore_dataset.get_clients()
+            logging.info("Client nodes taken from data manifest. (%s)", ', '.join(client_node_list))
+            if not client_node_list or len(client_node_list) == 0:
+                return {'status': 'failure', 'message': 'No client nodes found in data manifest.'}
+
+        # Health check. Node selection
+        if not health_check_path:
+            logging.info("Health check is disabled, proceeding without it")
             api_client.server_node = server_node
-        logging.info(f"server: {api_client.health_sites_data[server_node]}")
-        if isinstance(client_node_list, str):
-            client_node_list = client_node_list.split(',')
-
-        api_client.client_nodes = []
-        logging.info("Checking client nodes health")
-        api_client.node_heartbeat(client_node_list)
-        for node in client_node_list:
-            if not api_client.health_sites_data.get(node):
-                logging.error(f"No client heartbeat data found for node {node}")
+            if client_node_list and isinstance(client_node_list, str):
+                api_client.client_nodes = client_node_list.split(',')   
+            else:
+                api_client.client_nodes = client_node_list
+        else:
+            api_client.server_node = None
+            if isinstance(client_node_list, str):
+                client_node_list = client_node_list.split(',')
+            # Server and clients are checked in a single parallel round
+            logging.info("Checking server and client nodes health")
+            api_client.node_heartbeat([server_node, *client_node_list])
+            if 'state' in api_client.health_sites_data[server_node] and \
+                    api_client.health_sites_data[server_node]['state'] == 'running':
+                api_client.server_node = server_node
+            logging.info("server: %s", api_client.health_sites_data[server_node])
+
+            health = api_client.health_sites_data
+            missing = [node for node in client_node_list if not health.get(node)]
+            if missing:
+                logging.error("No client heartbeat data found for nodes %s", missing)
                 return {'status': 'failure', 'message': 'No client heartbeat data found.'}
-            logging.info(f"client: {api_client.health_sites_data[node]}")
-            if 'state' in api_client.health_sites_data[node] and \
-                    api_client.health_sites_data[node]['state'] == 'running':
-                api_client.client_nodes.append(node)
+            api_client.client_nodes = [node for node in client_node_list if health[node].get('state') == 'running']
+            logging.info(
+                "Running clients: %s; not running: %s",
+                api_client.client_nodes, [node for node in client_node_list if node not in api_client.client_nodes]
+            )
 
-        logging.info(f"Saving heartbeat data on file {health_check_path}")
-        try:
-            with open(f"{output_path}/{health_check_path}", "w", encoding='utf-8') as f:
-                json.dump(api_client.health_sites_data, f, indent=4)
-        except Exception as e:
-            logging.error(f"Failed to save health check data: {e}")
-
-        if not api_client.server_node or len(api_client.client_nodes) == 0:
-            logging.error("No enough active nodes found.")
-            return {'status': 'failure', 'message': 'No enough active nodes found.'}
-        logging.info(f"Active server node: {api_client.server_node}")
-        logging.info(f"Active client nodes: {api_client.client_nodes}")
-
-    all_nodes = set([api_client.server_node] + api_client.client_nodes)
-    # Get variables from Opal if provided
-    if input_variables_path:
-        opal_vars = FlcoreOpalVariables(input_variables_path=input_variables_path)
-        if not opal_vars.variables or len(opal_vars.variables) == 0:
-            return {'status': 'failure', 'message': 'No variables found in Opal variables file.'}
-        logging.info(f"Variables taken from Opal variables file. ({', '.join(opal_vars.get_variable_names())})")
-        if not target_label:
-            logging.info(f"Target label not provided. Using {target_label} as target label.")
-
-    else:
-        opal_vars = None
-        logging.info("No Opal variables file provided.")
-    # Tool Submission
-    flcore_params = FlcoreParams(
-        input_params_path=input_params_path,
-        num_clients=len(api_client.client_nodes),
-        dataset_id=flcore_dataset.get_dataset_id(),
-        opal_vars=opal_vars
-    )
-    params_data = flcore_params.get_params_json()
+            logging.info("Saving heartbeat data on file %s", health_check_path)
+            try:
+                with open(f"{output_path}/{health_check_path}", "w", encoding='utf-8') as f:
+                    if orjson:
+                        f.write(orjson.dumps(api_client.health_sites_data, option=orjson.OPT_INDENT_2).decode('utf-8'))
+                    else:
+                        json.dump(api_client.health_sites_data, f, indent=4)
+            except Exception as e:
+                logging.error("Failed to save health check data: %s", e)
+
+            if not api_client.server_node or len(api_client.client_nodes) == 0:
+                logging.error("No enough active nodes found.")
+                return {'status': 'failure', 'message': 'No enough active nodes found.'}
+            logging.info("Active server node: %s", api_client.server_node)
+
+        all_nodes = api_client.all_nodes
+        # Get variables from Opal if provided
+        if input_variables_path:
+            opal_vars = FlcoreOpalVariables(input_variables_path=input_variables_path)
+            if not opal_vars.variables or len(opal_vars.variables) == 0:
+                return {'status': 'failure', 'message': 'No variables found in Opal variables file.'}
+            logging.info(
+                "Variables taken from Opal variables file. (%s)",
+                ', '.join(opal_vars.get_variable_names())
+            )
+            if not target_label:
+                logging.info("Target label not provided. Using %s as target label.", target_label)
 
-    logging.info(f"FEM params = {params_data}")
+        else:
+            opal_vars = None
+            logging.info("No Opal variables file provided.")
+        # Tool Submission
+        flcore_params = FlcoreParams(
+            input_params_path=input_params_path,
+            num_clients=len(api_client.client_nodes),
+            dataset_id=flcore_dataset.get_dataset_id(),
+            opal_vars=opal_vars
+        )
+        params_data = flcore_params.get_params_json()
 
-    logging.info(f"Running tool {tool_name} on nodes")
+        logging.info("FEM params = %s", params_data)
+
+        logging.info("Running tool %s on nodes", tool_name)
 
-    try:
-        api_client.submit_tool(
-            {
-                'tool_name': tool_name,
-                'input_params': params_data,
-                'wait_for_job': True,
-                'polling': POLLING_INTERVAL,
-                'timeout': job_timeout
-            }
-        )
-    except Exception as e:
-        msg = f"Failed to execute tool {tool_name} on nodes {all_nodes}: {e}"
-        logging.error(msg)
-        return {'status': 'failure', 'message': msg}
-
-    # Allowing time for the results to settle
-    logging.info(f"Allowing time for results to settle ({finish_wait}s)")
-    time.sleep(finish_wait)
-
-    #Files at sites
-    files_loaded = False
-    files_timeout = FILES_TIMEOUT
-    while not files_loaded and files_timeout > 0:   
-        # Get files at sites
         try:
-            files = api_client.get_execution_file_list()
-            logging.info(f"Files at sites: {files}")
+            api_client.submit_tool(
+                {
+                    'tool_name': tool_name,
+                    # Sent as the cached bytes, no re-encoding of the JSON string
+                    'input_params': flcore_params.get_params_json_bytes(),
+                    'wait_for_job': True,
+                    'polling': polling_interval,
+                    'max_polling': max_polling_interval,
+                    'polling_backoff': polling_backoff,
+                    'timeout': job_timeout
+                }
+            )
         except Exception as e:
-            logging.error(f"Failed to get execution files: {e}")
-            return {'status': 'failure', 'message': f"Failed to get execution files: {e}"}
+            msg = f"Failed to execute tool {tool_name} on nodes {all_nodes}: {e}"
+            logging.error(msg)
+            return {'status': 'failure', 'message': msg}
+
+        # Allowing time for the results to settle: the file list is polled until the server
+        # and client logs are listed, finish_wait is only the upper bound
+        logging.info("Waiting up to %ss for results to settle", finish_wait)
+        settle_start = time.time()
+        deadline = settle_start + finish_wait
+        files = None
+        while True:
+            try:
+                files = api_client.get_execution_file_list()
+                ready = _outputs_ready(files, api_client.server_node, api_client.client_nodes)
+            except Exception as e:
+                # Transient errors are retried until the deadline
+                logging.error("Failed to get execution files: %s", e)
+                error = e
+                ready = False
+            remaining = deadline - time.time()
+            if ready or remaining <= 0:
+                break
+            time.sleep(min(SETTLE_POLLING_INTERVAL, remaining))
+        if files is None:
+            return {'status': 'failure', 'message': f"Failed to get execution files: {error}"}
+        logging.info("Results settled after %.1fs", time.time() - settle_start)
+
+        #Files at sites
         files_loaded = 'user_id' not in files
-        if not files_loaded:
-            logging.warning(f"Files not loaded yet, waiting {POLLING_INTERVAL}s and retrying")
-        time.sleep(POLLING_INTERVAL)
-        files_timeout -= POLLING_INTERVAL
-
-
-    # Download files
-    
-    for node in all_nodes:
-        if node not in files or 'files' not in files[node]:
-            logging.warning(f"No files found for node {node}")
-            continue
-        for file in files[node]['files']:
+        while not files_loaded and files_timeout > 0:
+            logging.warning("Files not loaded yet, waiting %ss and retrying", POLLING_INTERVAL)
+            time.sleep(POLLING_INTERVAL)
+            files_timeout -= POLLING_INTERVAL
+            # Get files at sites
             try:
-                file_content = api_client.download_file(node=node, file_name=file)
-                if (file_content):
-                    with open(f"{output_path}/{node}_{file}", 'wb') as f:
-                        f.write(file_content)
-                        logging.info(f"Downloaded file {file} from node {node}")
-                else:
-                    logging.warning(f"No content found for file {file} from node {node}")
+                files = api_client.get_execution_file_list()
             except Exception as e:
-                logging.error(f"Failed to download file {file} from node {node}: {e}")
-
-    # Generate report if log file found
-    Flwr_log_file = api_client.server_node + '_log_server.txt'
-    if os.path.exists(f"{output_path}/{Flwr_log_file}"):    
-        logging.info(f"Generating FLCore report from log file {Flwr_log_file}")
-        parser = FLCoreLogParser(f"{output_path}/{Flwr_log_file}")
-        data = parser.parse_logs()
+                logging.error("Failed to get execution files: %s", e)
+                return {'status': 'failure', 'message': f"Failed to get execution files: {e}"}
+            files_loaded = 'user_id' not in files
+        logging.info("Files at sites: %s", files)
+
+
+        # Download files
+        # Output directory created once, the downloads only open their own file
+        if output_path:
+            os.makedirs(output_path, exist_ok=True)
+        downloads = []
+        for node in all_nodes:
+            if node not in files or 'files' not in files[node]:
+                logging.warning("No files found for node %s", node)
+                continue
+            downloads.extend((node, file) for file in files[node]['files'])
+
+        # The report is generated as soon as the server log lands, overlapping the other downloads
+        Flwr_log_file = api_client.server_node + '_log_server.txt'
         report_file = f"{output_path}/flcore_report.html"
-        generator = HTMLReportGenerator(data)
-        generator.generate_html(report_file)
-        logging.info(f"FLCore report generated: {report_file}")
+        report = None
+        with ThreadPoolExecutor(max_workers=1) as pool:
+
+            def _start_report(node, file, written):
+                nonlocal report
+                if f"{node}_{file}" == Flwr_log_file and not isinstance(written, Exception) and written:
+                    logging.info("Generating FLCore report from log file %s", Flwr_log_file)
+                    report = pool.submit(_generate_report, f"{output_path}/{Flwr_log_file}", report_file)
+
+            results = api_client.download_files_bulk(downloads, output_path, on_done=_start_report)
+            for (node, file), written in results.items():
+                if isinstance(written, Exception):
+                    logging.error("Failed to download file %s from node %s: %s", file, node, written)
+                elif written:
+                    logging.info("Downloaded file %s from node %s", file, node)
+                else:
+                    logging.warning("No content found for file %s from node %s", file, node)
+
+            # Generate report if log file found, only stat'ed when it was not downloaded in this run
+            if report is None and os.path.exists(f"{output_path}/{Flwr_log_file}"):
+                logging.info("Generating FLCore report from log file %s", Flwr_log_file)
+                report = pool.submit(_generate_report, f"{output_path}/{Flwr_log_file}", report_file)
+            if report is not None:
+                try:
+                    logging.info("FLCore report generated: %s", report.result())
+                except Exception as e:
+                    # The run itself succeeded, a missing report is not a failure
+                    logging.error("Failed to generate FLCore report: %s", e)
 
     
-    return {
-        'status': 'success',
-        'message': f"Tool \"{tool_name}\" run on server {api_client.server_node} and clients {api_client.client_nodes}.",
-        'execution_id': api_client.execution.id,
-        'execution_logs': api_client.execution.logs,
-        'files': files
-    }
+        return {
+            'status': 'success',
+            'message': f"Tool \"{tool_name}\" run on server {api_client.server_node} and clients {api_client.client_nodes}.",
+            'execution_id': api_client.execution.id,
+            'execution_logs': api_client.execution.logs,
+            'files': files
+        }
 
 
 if __name__ == '__main__':
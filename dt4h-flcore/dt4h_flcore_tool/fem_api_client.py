@@ -1,12 +1,52 @@
 ''' Generic client for FEM API'''
 
 import logging
+import base64
+import os
 import time
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows, the token cache is then used without locking
+    fcntl = None
 
 # Constants
 
-REQUEST_TIMEOUT = 500  # seconds
+REQUEST_TIMEOUT = 500  # seconds, read timeout
+CONNECT_TIMEOUT = 5  # seconds, a dead server fails fast
+STATUS_TIMEOUT = 30  # seconds, read timeout of the status polls
+# Connection pool shared by all the calls of a client, retrying idempotent
+# requests on connection and gateway errors. Read timeouts are not retried,
+# a stuck request already waits the whole request timeout.
+POOL_CONNECTIONS = 8
+POOL_MAXSIZE = 32
+RETRY_TOTAL = 3
+RETRY_BACKOFF = 0.5
+RETRY_STATUS = (502, 503, 504)
+# Parallel requests to the nodes, kept under the pool size
+MAX_NODE_WORKERS = 16
+# Result files are streamed to disk in chunks, several at a time
+DOWNLOAD_CHUNK_SIZE = 1 << 20  # bytes
+DOWNLOAD_WORKERS = min(8, os.cpu_count() or 1)
+# Job status polling backs off from the requested interval up to this cap
+MAX_POLLING_INTERVAL = 30.0  # seconds
+POLLING_BACKOFF = 1.5
+
+# Tokens obtained with user/password can be cached here until shortly before they expire.
+# Opt-in, see FEMAPIClient.authenticate
+TOKEN_CACHE_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'dt4h', 'fem_token.json')
+TOKEN_EXPIRY_MARGIN = 60  # seconds
 
 # API ENDPOINTS
 URL_TOKEN = 'token'
@@ -28,6 +68,16 @@ URL_FILES = 'data/list_files'
 URL_DOWNLOAD = 'data/download_files'
 
 
+def _token_expiry(token: str) -> float:
+    '''Expiry time (exp claim) of a JWT, 0 when it cannot be read. The signature is not checked.'''
+    try:
+        payload = token.split('.')[1]
+        payload += '=' * (-len(payload) % 4)
+        return float(json.loads(base64.urlsafe_b64decode(payload)).get('exp', 0))
+    except (IndexError, ValueError, TypeError, AttributeError):
+        return 0
+
+
 class Execution:
     '''Wrapper for execution data'''
     def __init__(self, execution=None):
@@ -37,79 +87,206 @@ class Execution:
         self.logs = None
 
 class FEMAPIClient:
-    """Client for interacting with the FEM API."""
+    """Client for interacting with the FEM API.
+    Calls share a keep-alive session, use it as a context manager (or call close())
+    to release the connections."""
     def __init__(self, api_prefix):
         self.api_prefix = api_prefix
         self.token = None
         self.tool_name = None
         self.health_sites_data = {}
+        self._all_nodes = None
         self.server_node = None
         self.client_nodes = []
         self.execution = None
+        self._session = self._create_session()
+        self._cancelled = threading.Event()
+        # (cache key, user, password) while the token in use comes from the disk cache
+        self._cached_auth = None
+        self._auth_lock = threading.RLock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Release the pooled connections."""
+        self._session.close()
+
+    # Nodes of the execution, assign them (do not mutate client_nodes) to keep all_nodes in sync
+    @property
+    def server_node(self) -> str:
+        return self._server_node
+
+    @server_node.setter
+    def server_node(self, node: str):
+        self._server_node = node
+        self._all_nodes = None
+
+    @property
+    def client_nodes(self) -> list:
+        return self._client_nodes
+
+    @client_nodes.setter
+    def client_nodes(self, nodes: list):
+        self._client_nodes = nodes
+        self._all_nodes = None
+
+    @property
+    def all_nodes(self) -> frozenset:
+        '''Server and client nodes, computed once per assignment.'''
+        if self._all_nodes is None:
+            self._all_nodes = frozenset(node for node in [self._server_node, *self._client_nodes] if node)
+        return self._all_nodes
 
     # Authentication
     # ---------------------------------------------------------------------------------------------
-    def authenticate(self, authtoken:str = None, user:str = None, password:str = None):
-        """Authenticate with the FEM API using a token."""
+    def authenticate(self, authtoken:str = None, user:str = None, password:str = None, use_cache:bool = False):
+        """Authenticate with the FEM API using a token.
+        With use_cache, tokens requested with user/password are reused from the disk cache
+        while still valid. A cached token rejected by the API is dropped and requested again once."""
         if authtoken:
             self.token = authtoken
         elif user and password:
-            data = {
-                "username": user,
-                "password": password,
-                "grant_type": "password"
-            }
-            headers = {
-                'Content-Type': 'application/x-www-form-urlencoded',
-                'accept': 'application/json'
-            }
-            response_json = self._do_post_request('token', headers=headers, data=data)
-            self.token = response_json.get('access_token')
+            cache_key = f"{user}@{self.api_prefix}"
+            if use_cache:
+                self.token = self._load_cached_token(cache_key)
+                if self.token:
+                    self._cached_auth = (cache_key, user, password)
+                    self._session.headers.update(self._create_auth_header())
+                    return
+            self.token = self._request_token(user, password)
+            if self.token and use_cache:
+                self._save_cached_token(cache_key, self.token)
+        if self.token:
+            # Built once, every later request carries it through the session
+            self._session.headers.update(self._create_auth_header())
+
+    def _request_token(self, user: str, password: str) -> str:
+        '''Request a new access token with user/password.'''
+        data = {
+            "username": user,
+            "password": password,
+            "grant_type": "password"
+        }
+        headers = {
+            'Content-Type': 'application/x-www-form-urlencoded',
+            'accept': 'application/json'
+        }
+        response_json = self._do_post_request(URL_TOKEN, headers=headers, data=data)
+        return response_json.get('access_token')
+
+    def _renew_cached_token(self, rejected_token: str) -> bool:
+        '''Replace a cached token rejected by the API with a fresh one, only once.
+        Returns whether the request can be retried with a new token.'''
+        with self._auth_lock:
+            if self.token != rejected_token:
+                # Already renewed by another thread
+                return True
+            if self._cached_auth is None:
+                return False
+            cache_key, user, password = self._cached_auth
+            self._cached_auth = None
+            logging.warning("Cached access token rejected, requesting a new one")
+            self._update_token_cache(cache_key, None)
+            token = self._request_token(user, password)
+            if not token:
+                return False
+            self.token = token
+            self._save_cached_token(cache_key, token)
+            self._session.headers.update(self._create_auth_header())
+            return True
+
+    @staticmethod
+    def _load_cached_token(cache_key: str) -> str:
+        '''Cached token for cache_key, None when missing or about to expire.'''
+        try:
+            with open(TOKEN_CACHE_PATH, 'r', encoding='utf-8') as f:
+                if fcntl:
+                    fcntl.flock(f, fcntl.LOCK_SH)
+                entry = json.load(f).get(cache_key) or {}
+        except (OSError, ValueError, AttributeError):
+            return None
+        if entry.get('exp', 0) > time.time() + TOKEN_EXPIRY_MARGIN:
+            return entry.get('access_token')
+        return None
+
+    @staticmethod
+    def _save_cached_token(cache_key: str, token: str):
+        '''Store a token in the cache, tokens without a readable expiry are not cached.'''
+        exp = _token_expiry(token)
+        if exp:
+            FEMAPIClient._update_token_cache(cache_key, {'access_token': token, 'exp': exp})
+
+    @staticmethod
+    def _update_token_cache(cache_key: str, entry: dict = None):
+        '''Set the cache entry of cache_key, or remove it when entry is None.'''
+        try:
+            os.makedirs(os.path.dirname(TOKEN_CACHE_PATH), mode=0o700, exist_ok=True)
+            fd = os.open(TOKEN_CACHE_PATH, os.O_RDWR | os.O_CREAT, 0o600)
+            with open(fd, 'r+', encoding='utf-8') as f:
+                if fcntl:
+                    fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    cache = json.load(f)
+                except ValueError:
+                    cache = {}
+                if entry is None:
+                    cache.pop(cache_key, None)
+                else:
+                    cache[cache_key] = entry
+                f.seek(0)
+                f.truncate()
+                json.dump(cache, f)
+        except OSError as e:
+            logging.warning("Failed to cache access token: %s", e)
 
     # Nodes
     # ----------------------------------------------------------------------------------------------
     def get_nodes(self) -> dict:
         '''Get the list of available hosts.'''
-        return self._do_get_request(URL_HOSTS, headers=self._create_auth_header())
+        return self._do_get_request(URL_HOSTS)
 
     def node_resources(self, node_list) -> dict:
         '''Get the list of available resources.'''
         if isinstance(node_list, str):
             node_list = [node_list]
-        query = [f'client_nodes={node}' for node in node_list]
         return self._do_get_request(
             URL_RESOURCES,
-            query_params='&'.join(query),
-            headers=self._create_auth_header()
+            query_params=[('client_nodes', node) for node in node_list]
         )
 
     def node_heartbeat(self, node) -> dict:
-        '''Check the heartbeat of a node.'''
+        '''Check the heartbeat of a node, or of a list of nodes in parallel.'''
         if isinstance(node, str):
             node = [node]
-        hbeats = {}
-        for node_id in node:
-            try:
-                hbeats[node_id] = self._do_get_request(
-                    URL_HEARTBEAT,
-                    {'node_name': node_id},
-                    headers=self._create_auth_header()
-                )
-            except Exception as e:
-                logging.error(f"Failed to get heartbeat for node {node_id}: {e}")
-                hbeats[node_id] = {'error': str(e)}
-            if isinstance(hbeats[node_id], list) and len(hbeats[node_id]) > 0:
-                hbeats[node_id] = hbeats[node_id][0] # !!!!!! Unstable format
-                if len(hbeats[node_id]) == 0:
-                    hbeats[node_id] = {'error': 'No heartbeat data available'}
-            self.health_sites_data[node_id] = hbeats[node_id]
+        if not node:
+            return
+        with ThreadPoolExecutor(max_workers=min(MAX_NODE_WORKERS, len(node))) as executor:
+            for node_id, hbeat in zip(node, executor.map(self._get_heartbeat, node)):
+                self.health_sites_data[node_id] = hbeat
+
+    def _get_heartbeat(self, node_id: str) -> dict:
+        '''Get the heartbeat of a single node.'''
+        try:
+            hbeat = self._do_get_request(
+                URL_HEARTBEAT,
+                {'node_name': node_id}
+            )
+        except Exception as e:
+            logging.error("Failed to get heartbeat for node %s: %s", node_id, e)
+            hbeat = {'error': str(e)}
+        if isinstance(hbeat, list) and len(hbeat) > 0:
+            hbeat = hbeat[0] # !!!!!! Unstable format
+            if len(hbeat) == 0:
+                hbeat = {'error': 'No heartbeat data available'}
+        return hbeat
 
     def node_info(self, node_id: str) -> dict:
         '''Get information about a specific node.'''
-        return self._do_get_request(
-            f'{URL_HOSTS_INFO}/{node_id}',
-            headers=self._create_auth_header()
-        )
+        return self._do_get_request(f'{URL_HOSTS_INFO}/{node_id}')
 
     def run_health_check(self, server_node=None, client_node_list=None) -> dict:
         '''Run health check on server and client nodes.'''
@@ -121,58 +298,45 @@ class FEMAPIClient:
         if 'state' in self.health_sites_data[server_node] and \
                 self.health_sites_data[server_node]['state'] == 'running':
             self.server_node = server_node
-        logging.info(f"server: {self.health_sites_data[server_node]}")
+        logging.info("server: %s", self.health_sites_data[server_node])
         if isinstance(client_node_list, str):
             client_node_list = client_node_list.split(',')
 
         logging.info("Checking client nodes health")
         self.node_heartbeat(client_node_list)
+        active_clients = []
         for node in client_node_list:
             if not self.health_sites_data.get(node):
-                logging.error(f"No client heartbeat data found for node {node}")
+                logging.error("No client heartbeat data found for node %s", node)
                 return {'status': 'failure', 'message': 'No client heartbeat data found.'}
-            logging.info(f"client: {self.health_sites_data[node]}")
+            logging.info("client: %s", self.health_sites_data[node])
             if 'state' in self.health_sites_data[node] and \
                     self.health_sites_data[node]['state'] == 'running':
-                self.client_nodes.append(node)
+                active_clients.append(node)
+        self.client_nodes = active_clients
 
     # Tools and Tasks
     # ---------------------------------------------------------------------------------------------
 
     def get_tools(self) -> dict:
         '''Get the list of available tools.'''
-        return self._do_get_request(
-            URL_TOOLS,
-            headers=self._create_auth_header()
-        )
+        return self._do_get_request(URL_TOOLS)
 
     def tool_info(self, tool_id: str) -> dict:
         '''Get information about a specific tool.'''
-        return self._do_get_request(
-            f'{URL_TOOL_INFO}/{tool_id}',
-            headers=self._create_auth_header()
-        )
+        return self._do_get_request(f'{URL_TOOL_INFO}/{tool_id}')
 
     def get_tool_id_from_name(self, tool_name: str) -> dict:
         '''Get information about a specific tool by name.'''
-        return self._do_get_request(
-            f'{URL_TOOL_ID}/{tool_name}',
-            headers=self._create_auth_header()
-        )
+        return self._do_get_request(f'{URL_TOOL_ID}/{tool_name}')
 
     def get_tasks(self) -> dict:
         '''Get the list of available tasks.'''
-        return self._do_get_request(
-            URL_TASKS,
-            headers=self._create_auth_header()
-        )
+        return self._do_get_request(URL_TASKS)
 
     def task_info(self, task_id: str) -> dict:
         '''Get information about a specific task.'''
-        return self._do_get_request(
-            f'{URL_TASK_INFO}/{task_id}',
-            headers=self._create_auth_header()
-        )
+        return self._do_get_request(f'{URL_TASK_INFO}/{task_id}')
 
     # Job management
     # ---------------------------------------------------------------------------------------------
@@ -180,87 +344,98 @@ class FEMAPIClient:
     def submit_tool(self, props: dict = None) -> dict:
         '''Submit a tool on the specified nodes and return the execution ID.'''
 
-        headers = self._create_auth_header()
-        headers['Content-Type'] = 'application/json'
+        # Authorization comes from the session headers
+        headers = {'Content-Type': 'application/json'}
 
         url = f"{URL_SUBMIT}/{props['tool_name']}"
-        url_params = []
-        if self.server_node is not None:
-            url_params.append(f"server_node={self.server_node}")
-        if self.client_nodes is not None:
-            for node in self.client_nodes:
-                url_params.append(f"client_nodes={node}")
-        if url_params:
-            url += f'?{"&".join(url_params)}'
-        logging.info(f"\t-- FEM URL = {url}")
+        # Repeated keys as a list of tuples, requests takes care of the quoting
+        url_params = [('server_node', self.server_node)] if self.server_node is not None else []
+        url_params += [('client_nodes', node) for node in self.client_nodes or []]
+        logging.info("\t-- FEM URL = %s %s", url, url_params)
 
         logging.info(
-            f"Triggering tool {props['tool_name']}"
-            f" in server nodes {self.server_node}"
-            f" and client nodes [{','.join(self.client_nodes)}]"
+            "Triggering tool %s in server nodes %s and client nodes [%s]",
+            props['tool_name'], self.server_node, ','.join(self.client_nodes)
         )
-        response_data = self._do_post_request(url, headers=headers, data=props['input_params'])
+        data = props['input_params']
+        if isinstance(data, str):
+            # Sent as UTF-8 bytes, requests would otherwise encode a str body as latin-1
+            data = data.encode('utf-8')
+        response_data = self._do_post_request(url, query_params=url_params, headers=headers, data=data)
 
         if response_data.get('status') != 'success' or 'execution_id' not in response_data:
             raise Exception("Submission failed")
 
-        logging.info(f"Tool {props['tool_name']} submitted successfully {response_data}")
+        logging.info("Tool %s submitted successfully %s", props['tool_name'], response_data)
 
         self.tool_name = props['tool_name']
         self.execution = Execution(response_data)
+        self._cancelled.clear()
 
         if props['wait_for_job']:
-            logging.info(f"Waiting for job {self.execution.id} to finish")
+            logging.info("Waiting for job %s to finish", self.execution.id)
             self.wait_for_job(
                 interval=props.get('polling', 5.0),
-                timeout=props.get('timeout', 300.0)
+                timeout=props.get('timeout', 300.0),
+                max_interval=props.get('max_polling', MAX_POLLING_INTERVAL),
+                backoff=props.get('polling_backoff', POLLING_BACKOFF)
             )
 
-    def wait_for_job(self, interval:float = 5.0, timeout:float = 300.0):
-        '''Polling until job finishes'''
+    def wait_for_job(self, interval:float = 5.0, timeout:float = 300.0,
+                     max_interval:float = MAX_POLLING_INTERVAL, backoff:float = POLLING_BACKOFF):
+        '''Polling until job finishes.
+        The wait grows by backoff up to max_interval while the job status does not change,
+        and goes back to interval when it does. cancel_run() stops the polling.'''
         start_time = time.time()
+        wait = interval
+        last_state = None
 
         while True:
-            logging.info(f"Waiting for {interval} seconds before checking job status...")
-            time.sleep(interval)
+            remaining = timeout - (time.time() - start_time)
+            wait = max(min(wait, remaining), 0)
+            logging.info("Waiting for %.1f seconds before checking job status...", wait)
+            if self._cancelled.wait(wait):
+                logging.info("Job %s cancelled, stop waiting", self.execution.id)
+                break
 
             self.execution.status = self.execution_status()
-            logging.info(f"Job status: {self.execution.status}")
+            logging.debug("Job status: %s", self.execution.status)
 
             if self.check_job_finished():
                 self.execution.logs = self.get_execution_logs()
-                logging.info(f"Execution logs: {self.execution.logs}")
+                logging.info("Execution logs: %s", self.execution.logs)
                 break
 
             if time.time() - start_time > timeout:
-                logging.error(f"Job timed out after {timeout} seconds")
+                logging.error("Job timed out after %s seconds", timeout)
                 self.execution.logs = "Job timed out before completion."
                 break
 
+            # Server hint first, then back off while the node states do not change
+            status = self.execution.status
+            if isinstance(status, dict) and status.get('retry_after'):
+                wait = float(status['retry_after'])
+                continue
+            state = [node.get('status') for node in status if isinstance(node, dict)] if isinstance(status, list) else None
+            wait = min(wait * backoff, max_interval) if state == last_state else interval
+            last_state = state
+
     def cancel_run(self) -> dict:
         '''Cancel the execution of a tool.'''
-        return self._do_post_request(
-            f'{URL_CANCEL}/{self.execution.id}',
-            headers=self._create_auth_header()
-        )
+        self._cancelled.set()
+        return self._do_post_request(f'{URL_CANCEL}/{self.execution.id}')
 
     def execution_status(self) -> dict:
         '''Check the status of the execution of a tool.'''
         try:
-            return self._do_get_request(
-                f'{URL_STATUS}/{self.execution.id}',
-                headers=self._create_auth_header()
-            )
+            return self._do_get_request(f'{URL_STATUS}/{self.execution.id}', timeout=STATUS_TIMEOUT)
         except Exception as e:
-            logging.error(f"Failed to get execution status: {e}")
+            logging.error("Failed to get execution status: %s", e)
             return {"error": str(e)}
 
     def execution_report(self) -> dict:
         '''Get the execution report of a tool.'''
-        return self._do_get_request(
-            f'{URL_REPORT}/{self.execution.id}',
-            headers=self._create_auth_header()
-        )
+        return self._do_get_request(f'{URL_REPORT}/{self.execution.id}')
 
     def check_job_finished(self) -> bool:
         '''Check if the job is finished based on the status of the nodes.
@@ -269,16 +444,15 @@ class FEMAPIClient:
             logging.error("Job status is empty")
             return False
 
-        logging.info(f"Job status: {self.execution.status}")
 
         for node_status in self.execution.status:
             if 'status' not in node_status:
-                logging.error(f"Node status does not contain 'status': {node_status}")
+                logging.error("Node status does not contain 'status': %s", node_status)
                 return False
             if node_status['status'] == 'running':
-                logging.info(f"Node {node_status['node']} is still running")
+                logging.info("Node %s is still running", node_status['node'])
                 return False
-            logging.info(f"Node {node_status['node']} is finished")
+            logging.info("Node %s is finished", node_status['node'])
         logging.info("No nodes are running, job is finished")
         return True
 
@@ -288,81 +462,166 @@ class FEMAPIClient:
         '''Get the logs of the execution of a tool.'''
         return self._do_get_request(
             f'{URL_LOGS}/{self.execution.id}',
-            headers=self._create_auth_header(),
             output='text'
         )
 
     def get_execution_file_list(self) -> dict:
         '''Get the list of files generated by the execution of a tool on specified nodes.'''
-        query = [f'nodes = {node}' for node in set([self.server_node] + self.client_nodes)]
-        query.append(f'execution_id={self.execution.id}')
-        query.append('path=/sandbox')
-        
-        file_list = self._do_get_request(
-            URL_FILES,
-            headers=self._create_auth_header(),
-            query_params='&'.join(query)
-        )
+        query = [('nodes', node) for node in self.all_nodes]
+        query.append(('execution_id', self.execution.id))
+        query.append(('path', '/sandbox'))
+
+        file_list = self._do_get_request(URL_FILES, query_params=query)
         if isinstance(file_list, list):
             file_list = file_list[0]
         return file_list
 
 
-    def download_file(self, node: str, file_name: str) -> bytes:
-        '''Download a file from the execution of a tool on a specific node.'''
+    def download_file(self, node: str, file_name: str, dest_path: str = None) -> bytes|int:
+        '''Download a file from the execution of a tool on a specific node.
+        With dest_path the content is streamed to that file, in chunks, and the number
+        of bytes written is returned. Empty or failed downloads leave no file behind.'''
 
-        url = f"{URL_DOWNLOAD}"
         params = {
             'execution_id': self.execution.id,
             'file': file_name,
             'node': node
         }
-        logging.debug(f"Downloading file from URL: {self.api_prefix}{url}")
-        return self._do_get_request(
+        logging.debug("Downloading file from URL: %s/%s", self.api_prefix, URL_DOWNLOAD)
+        if dest_path is None:
+            return self._do_get_request(
+                URL_DOWNLOAD,
+                query_params=params,
+                output='binary'
+            )
+
+        response = self._do_get_request(
             URL_DOWNLOAD,
-            headers=self._create_auth_header(),
             query_params=params,
-            output='binary'
+            output='stream'
         )
+        if not isinstance(response, requests.Response):
+            raise requests.RequestException(response.get('error'))
+        try:
+            # Buffer as large as a chunk, every chunk goes out in a single write call
+            with response, open(dest_path, 'wb', buffering=DOWNLOAD_CHUNK_SIZE) as f:
+                written = sum(f.write(chunk) for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE))
+        except Exception:
+            if os.path.exists(dest_path):
+                os.remove(dest_path)
+            raise
+        if not written:
+            os.remove(dest_path)
+        return written
+
+    def download_files_bulk(self, downloads, output_path: str, on_done=None) -> dict:
+        '''Download (node, file name) pairs in parallel, each one streamed to output_path/<node>_<file>.
+        Returns the bytes written for each pair, or the exception that stopped its download.
+        on_done(node, file_name, result) is called as soon as each download finishes.'''
+        downloads = list(downloads)
+        if not downloads:
+            return {}
+        results = {}
+        with ThreadPoolExecutor(max_workers=min(DOWNLOAD_WORKERS, len(downloads))) as executor:
+            futures = {executor.submit(self._download_to, output_path, *nf): nf for nf in downloads}
+            for future in as_completed(futures):
+                node, file_name = futures[future]
+                results[(node, file_name)] = future.result()
+                if on_done is not None:
+                    on_done(node, file_name, results[(node, file_name)])
+        return {nf: results[nf] for nf in downloads}
+
+    def _download_to(self, output_path: str, node: str, file_name: str) -> int|Exception:
+        '''Stream a file to output_path, returning the error instead of raising it.'''
+        try:
+            return self.download_file(node, file_name, dest_path=f"{output_path}/{node}_{file_name}")
+        except Exception as e:
+            return e
 
     # Communication
     # ---------------------------------------------------------------------------------------------
+    @staticmethod
+    def _create_session():
+        '''Create the HTTP session, connections are kept alive and reused between calls.'''
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=POOL_CONNECTIONS,
+            pool_maxsize=POOL_MAXSIZE,
+            max_retries=Retry(
+                total=RETRY_TOTAL, read=0, backoff_factor=RETRY_BACKOFF, status_forcelist=RETRY_STATUS
+            )
+        )
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
     def _create_auth_header(self):
-        '''Create the authorization header for API requests.'''
+        '''Create the authorization header for API requests, set on the session once authenticated.'''
         return {
             'Authorization': f'Bearer {self.token}',
             'accept': 'application/json'
         }
 
-    def _do_get_request(self, endpoint, query_params=None, headers=None, output='json'):
-        '''Perform a get request'''
+    @staticmethod
+    def _parse_json(response):
+        '''Decode a JSON response body, with orjson when available'''
+        if orjson:
+            return orjson.loads(response.content)
+        return response.json()
+
+    def _send(self, method: str, url: str, **kwargs) -> requests.Response:
+        '''Send a request through the session. A 401 on a token from the disk cache
+        renews the token and sends the request once more.'''
+        token = self.token
+        response = self._session.request(method, url, **kwargs)
+        if response.status_code == 401 and self._renew_cached_token(token):
+            response.close()
+            response = self._session.request(method, url, **kwargs)
+        return response
+
+    def _do_get_request(self, endpoint, query_params=None, headers=None, output='json', timeout=REQUEST_TIMEOUT):
+        '''Perform a get request, timeout being the read timeout'''
         url = f"{self.api_prefix}/{endpoint}"
         try:
-            response = requests.get(
+            response = self._send(
+                'GET',
                 url,
                 params=query_params,
                 headers=headers,
-                timeout=REQUEST_TIMEOUT
+                timeout=(CONNECT_TIMEOUT, timeout),
+                stream=output == 'stream'
             )
             response.raise_for_status()
+            if output == 'stream':
+                # Body not read yet, the caller iterates and closes the response
+                return response
             if output == 'json':
-                return response.json()
+                return self._parse_json(response)
             if output == 'binary':
                 return response.content
             if output == 'text':
                 return response.text
-        except requests.RequestException as e:
-            logging.error(f"GET request failed: {e}")
+        except (requests.RequestException, ValueError) as e:
+            if getattr(e, 'response', None) is not None:
+                e.response.close()
+            logging.error("GET request failed: %s", e)
             return {"error": str(e)}
         return {"error": "Unknown error"}
 
-    def _do_post_request(self, endpoint, headers=None, data=None):
+    def _do_post_request(self, endpoint, query_params=None, headers=None, data=None):
         '''Perform a post request'''
         url = f"{self.api_prefix}/{endpoint}"
         try:
-            response = requests.post(url, headers=headers, data=data, timeout=REQUEST_TIMEOUT)
+            response = self._send(
+                'POST',
+                url,
+                params=query_params,
+                headers=headers,
+                data=data,
+                timeout=(CONNECT_TIMEOUT, REQUEST_TIMEOUT)
+            )
             response.raise_for_status()
-            return response.json()
-        except requests.RequestException as e:
-            logging.error(f"POST request failed: {e}")
+            return self._parse_json(response)
+        except (requests.RequestException, ValueError) as e:
+            logging.error("POST request failed: %s", e)
             return {"error": str(e)}
@@ -1,13 +1,21 @@
 ''' Class to represent flcore input '''
 
+import copy
+import functools
 import logging
 import json
-import sys
+import os
 import zipfile
-import yaml
+from types import MappingProxyType
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
-DEFAULT_TRAIN_LABELS =  [
+
+# Tuple on purpose: the defaults are never modified
+DEFAULT_TRAIN_LABELS = (
     'encounters_encounterClass',
     'encounters_admissionYear',
     'vital_signs_systolicBp_value_last',
@@ -17,149 +25,272 @@ DEFAULT_TRAIN_LABELS =  [
     'vital_signs_height_value_first',
     'lab_results_crpNonHs_value_avg',
     'lab_results_tropIHs_value_min'
-]
+)
 
 DEFAULT_TARGET_LABEL = 'conditions_stroke_any'
 
-DEFAULT_SERVER_PARAMS = {
-    'n_features': len(DEFAULT_TRAIN_LABELS),
+_MODEL_RF = 'random_forest'
+
+# Precomputed forms of the default labels, used on every FlcoreParams construction
+_DEFAULT_TRAIN_LABELS_JOINED = ' '.join(DEFAULT_TRAIN_LABELS)
+_DEFAULT_N_FEATURES = len(DEFAULT_TRAIN_LABELS)
+
+# Read-only views, instances get their own copies so the defaults are never modified
+DEFAULT_SERVER_PARAMS = MappingProxyType({
+    'n_features': _DEFAULT_N_FEATURES,
     'num_rounds': 1,
     'num_clients': 1
+})
+
+# Parameters used when no params file is given. FlcoreParams copies it
+# and only fills in the per-run server fields.
+_DEFAULT_PARAMS_TEMPLATE = MappingProxyType({
+    'server': DEFAULT_SERVER_PARAMS,
+    'model': _MODEL_RF,
+    'train_labels': _DEFAULT_TRAIN_LABELS_JOINED,
+    'target_label': DEFAULT_TARGET_LABEL,
+})
+
+def _json_loads(data: bytes):
+    ''' Parse a JSON document, with orjson when available. Both raise json.JSONDecodeError.'''
+    return orjson.loads(data) if orjson else json.loads(data)
+
+
+_yaml = None
+_yaml_loader = None
+
+
+def _load_yaml(data: bytes) -> dict:
+    ''' Parse a YAML document. PyYAML is only imported the first time it is needed.'''
+    global _yaml, _yaml_loader
+    if _yaml is None:
+        import yaml
+        _yaml = yaml
+        # libyaml based safe loader, when PyYAML was built with it
+        _yaml_loader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+    try:
+        return _yaml.load(data, Loader=_yaml_loader)
+    except _yaml.YAMLError as e:
+        raise ValueError(str(e)) from e
+
+
+# Params file parsers keyed by lowercased file extension
+_PARAMS_LOADERS = {
+    'json': _json_loads,
+    'yml': _load_yaml,
+    'yaml': _load_yaml,
 }
 
 
+def _file_ext(path: str) -> str:
+    ''' Lowercased extension without the dot, empty when the file name has none.'''
+    return os.path.splitext(path)[1][1:].lower()
+
+
+def _read_file(path: str) -> bytes:
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def _read_opal_zip(path: str) -> bytes:
+    ''' JSON document of the first study found in an Opal ZIP export.'''
+    with zipfile.ZipFile(path, 'r') as zip_ref:
+        json_files = [f for f in zip_ref.namelist() if f.endswith('.json')]
+        if not json_files:
+            raise ValueError("No JSON file found in the ZIP archive.")
+        # Read in one call into a single buffer
+        return zip_ref.read(json_files[0])
+
+
+# Opal export readers keyed by lowercased file extension, returning the JSON document
+_OPAL_READERS = {
+    'zip': _read_opal_zip,
+    'json': _read_file,
+}
+
+
+def _file_signature(path: str) -> tuple[str, int, int]:
+    ''' (path, mtime_ns, size) key of the file caches below, so an edited file is parsed again.'''
+    st = os.stat(path)
+    return os.path.abspath(path), st.st_mtime_ns, st.st_size
+
+
+@functools.lru_cache(maxsize=32)
+def _load_params_file(path: str, mtime_ns: int, size: int) -> dict:
+    ''' Read and parse a params file. Cached per file signature.'''
+    return _PARAMS_LOADERS[_file_ext(path)](_read_file(path))
+
+
+@functools.lru_cache(maxsize=32)
+def _load_json_file(path: str, mtime_ns: int, size: int):
+    ''' Read and parse a JSON file. Cached per file signature.'''
+    return _json_loads(_read_file(path))
+
+
+@functools.lru_cache(maxsize=32)
+def _load_opal_variables(path: str, mtime_ns: int, size: int) -> tuple[str, ...]:
+    ''' Read the variable names of an Opal export, ZIP or JSON. Cached per file signature.'''
+    opal_data = _json_loads(_OPAL_READERS[_file_ext(path)](path))
+    variables = opal_data["Magma.VariableListViewDto.view"]['variables']
+    return tuple(var['name'] for var in variables)
+
+
+def _dataset_node(dataset_id: str) -> str | None:
+    ''' Node of a 'node:dataset_id' reference, None when it has no node part.'''
+    node, sep, _ = dataset_id.partition(':')
+    return node if sep else None
+
+
 class FlcoreDataset:
     ''' Class to represent the FLCore dataset as stored in VRE user space'''
-    def __init__(self, input_dataset_path: str = None):
+    __slots__ = ('dataset',)
+
+    def __init__(self, input_dataset_path: str = None) -> None:
         if input_dataset_path is None:
             self.dataset = {}
             return
-        with open(input_dataset_path, 'r', encoding='utf-8') as dataset_file:
-            try:
-                self.dataset = json.load(dataset_file)
-            except json.JSONDecodeError:
-                logging.error(f"Failed to load dataset from {input_dataset_path}: {e}")
-                raise ValueError(f"Failed to load dataset file: {e}")
+        signature = _file_signature(input_dataset_path)
+        try:
+            # The cached object is shared, each instance gets its own copy
+            self.dataset = copy.deepcopy(_load_json_file(*signature))
+        except json.JSONDecodeError as e:
+            logging.error("Failed to load dataset from %s: %s", input_dataset_path, e)
+            raise ValueError(f"Failed to load dataset file: {e}") from e
         
-    def get_dataset_id(self):
+    def get_dataset_id(self) -> str | list[str] | None:
         if isinstance(self.dataset, list):
             return [dts.get('dataset_id', None) for dts in self.dataset if 'dataset_id' in dts]
         return self.dataset.get('dataset_id', None)
 
-    def get_clients(self):
-        if isinstance(self.dataset, list):
-            nodes = set()
-            for dts in self.dataset:
-                if 'dataset_id' in dts and ':' in dts['dataset_id']:
-                    node, _ = dts['dataset_id'].split(':', 1)
-                    nodes.add(node)
-            return list(nodes)
-        if 'dataset_id' in self.dataset and ':' in self.dataset['dataset_id']:
-            node, _ = self.dataset['dataset_id'].split(':', 1)
-            return [node]
-        return []
+    def get_clients(self) -> list[str]:
+        datasets = self.dataset if isinstance(self.dataset, list) else (self.dataset,)
+        nodes = {_dataset_node(dts['dataset_id']) for dts in datasets if 'dataset_id' in dts}
+        nodes.discard(None)
+        return list(nodes)
 
 class FlcoreOpalVariables:
     ''' Class to represent the FLCore variables as obtained from Mica search'''
-    def __init__(self, input_variables_path: str = None):
-        self.variables = {}
+    __slots__ = ('variables', 'variables_str')
+
+    def __init__(self, input_variables_path: str = None) -> None:
+        self.variables = ()
+        self.variables_str = ''
         if input_variables_path is None:
             return
+        if _file_ext(input_variables_path) not in _OPAL_READERS:
+            raise ValueError('Unsupported file format. Use ZIP')
         try:
-            if input_variables_path.endswith('.zip'):
-                with zipfile.ZipFile(input_variables_path, 'r') as zip_ref:
-                    json_files = [f for f in zip_ref.namelist() if f.endswith('.json')]
-                    if not json_files:
-                        raise ValueError("No JSON file found in the ZIP archive.")
-                    with zip_ref.open(json_files[0]) as json_file: # Open the first study found
-                        opal_data = json.load(json_file)
-            elif input_variables_path.endswith('.json'):
-                with open(input_variables_path, 'r', encoding='utf-8') as json_file:
-                    opal_data = json.load(json_file)
-            else:
-                raise ValueError('Unsupported file format. Use ZIP')
-            self.variables = [var['name'] for var in opal_data["Magma.VariableListViewDto.view"]['variables']]
+            # Tuple of names, shared with the cache as it is immutable
+            self.variables = _load_opal_variables(*_file_signature(input_variables_path))
         except (json.JSONDecodeError, zipfile.BadZipFile) as e:
-            logging.error(f"Failed to load variables from {input_variables_path}: {e}")
-            raise ValueError(f"Failed to load variables file: {e}")
+            logging.error("Failed to load variables from %s: %s", input_variables_path, e)
+            raise ValueError(f"Failed to load variables file: {e}") from e
         except FileNotFoundError as e:
-            logging.error(f"Variables file not found: {e}")
-            raise ValueError(f"Variables file not found: {e}")
+            logging.error("Variables file not found: %s", e)
+            raise ValueError(f"Variables file not found: {e}") from e
+        # Joined once, as sent in the train_labels param
+        self.variables_str = ' '.join(self.variables)
 
-    def get_variable_names(self):
+    def get_variable_names(self) -> list[str]:
         ''' Get the names of the Opal variables.'''
         return list(self.variables)
 
 class FlcoreParams:
     ''' Class to represent the FLCore parameters for model training'''
+    __slots__ = ('input_params', '_cached_json', '_cached_json_bytes')
+
     def __init__(
             self, 
             input_params_path: str = None,
             num_clients:int = 1,
-            dataset_id: str = None,
-            opal_vars=None,
+            dataset_id: str | list[str] = None,
+            opal_vars: FlcoreOpalVariables = None,
             target_label: str = None 
-        ):
+        ) -> None:
         ''' Initialize the FLCore parameters.'''
-        self.input_params = {
-            'server': DEFAULT_SERVER_PARAMS,
-            'model': 'random_forest',
-            'train_labels': ' '.join(DEFAULT_TRAIN_LABELS),
-            'target_label': DEFAULT_TARGET_LABEL,
-        }
-        self.input_params['server']['num_clients'] = num_clients
-
-        if input_params_path is not None:
+        self._cached_json = None
+        self._cached_json_bytes = None
+        if input_params_path is None:
+            self.input_params = {
+                **_DEFAULT_PARAMS_TEMPLATE,
+                'server': {**DEFAULT_SERVER_PARAMS, 'num_clients': num_clients},
+            }
+        else:
+            if _file_ext(input_params_path) not in _PARAMS_LOADERS:
+                raise ValueError('Unsupported file format. Use JSON or YAML.')
             try:
-                with open(input_params_path, 'r', encoding='utf-8') as params_file:
-                    if input_params_path.endswith('.json'):
-                        self.input_params = json.load(params_file)
-                    elif input_params_path.endswith('.yml') or input_params_path.endswith('.yaml'):
-                        self.input_params = yaml.safe_load(params_file)
-                    else:
-                        raise ValueError('Unsupported file format. Use JSON or YAML.')
-            except (json.JSONDecodeError, yaml.YAMLError) as e:
-                logging.error(f"Failed to load input parameters from {input_params_path}: {e}")
-                raise ValueError(f"Failed to load input parameters file: {e}")
+                # The cached dict is shared, the copy is modified below
+                self.input_params = copy.deepcopy(
+                    _load_params_file(*_file_signature(input_params_path))
+                )
+            except ValueError as e:  # JSON decode errors and YAML errors from _load_yaml
+                logging.error("Failed to load input parameters from %s: %s", input_params_path, e)
+                raise ValueError(f"Failed to load input parameters file: {e}") from e
             except FileNotFoundError as e:
-                logging.error(f"Input parameters file not found: {e}")
-                raise ValueError(f"Input parameters file not found: {e}")
+                logging.error("Input parameters file not found: %s", e)
+                raise ValueError(f"Input parameters file not found: {e}") from e
 
-            if 'server' in self.input_params:
-                if 'num_clients' not in self.input_params['server']:
-                    self.input_params['server']['num_clients'] = num_clients
-                for key in self.input_params['server']:
-                    self.input_params['server'][key] = self.input_params['server'][key]
+            server_params = self.input_params.get('server')
+            if server_params is not None:
+                server_params.setdefault('num_clients', num_clients)
 
-            for key in self.input_params['client']:
-                self.input_params[key] = self.input_params['client'][key]
-            del self.input_params['client']
+            # Client params are promoted to the top level
+            self.input_params.update(self.input_params.pop('client'))
 
+            # 'node:dataset_id' entries, split with a single partition scan
             if isinstance(dataset_id, str) and dataset_id != '':
-                if ':' not in dataset_id:
+                node, sep, dts_id = dataset_id.partition(':')
+                if not sep:
                     self.input_params['data_id'] = dataset_id
                 else:
-                    node, dts_id = dataset_id.split(':', 1)
-                    if node not in self.input_params:
-                        self.input_params[node] = {}
-                    self.input_params[node]['data_id'] = dts_id
+                    self.input_params.setdefault(node, {})['data_id'] = dts_id
             elif isinstance(dataset_id, list) and len(dataset_id) > 0:
                 for dts in dataset_id:
-                    if ':' not in dts:
-                        logging.error(f"Invalid dataset_id format: {dts}. Expected format 'node:dataset_id'.")
+                    node, sep, dts_id = dts.partition(':')
+                    if not sep:
+                        logging.error("Invalid dataset_id format: %s. Expected format 'node:dataset_id'.", dts)
                         continue
-                    node, dts_id = dts.split(':', 1)
-                    if node not in self.input_params:
-                        self.input_params[node] = {}
-                    self.input_params[node]['data_id'] = dts_id
+                    self.input_params.setdefault(node, {})['data_id'] = dts_id
             if opal_vars is not None and len(opal_vars.variables) > 0:
-                self.input_params['train_labels'] = ' '.join(opal_vars.variables)
+                train_labels = opal_vars.variables
+                self.input_params['train_labels'] = opal_vars.variables_str
+            else:
+                # Labels may come as a list or as a space separated string
+                train_labels = self.input_params.get('train_labels', DEFAULT_TRAIN_LABELS)
+                if train_labels is DEFAULT_TRAIN_LABELS:
+                    self.input_params['train_labels'] = _DEFAULT_TRAIN_LABELS_JOINED
+                else:
+                    if isinstance(train_labels, str):
+                        train_labels = train_labels.split()
+                    self.input_params['train_labels'] = ' '.join(train_labels)
+            if server_params is not None:
+                server_params.setdefault('n_features', len(train_labels))
             self.input_params['target_label'] = target_label if target_label else DEFAULT_TARGET_LABEL
 
-    def get_params_json(self):
-        '''Get the FLCore parameters as a JSON string.'''
+    def get_params_json_bytes(self) -> bytes | dict:
+        '''Get the FLCore parameters as UTF-8 encoded JSON, ready to be sent as a request body.'''
+        if self._cached_json_bytes is not None:
+            return self._cached_json_bytes
         try:
-            return json.dumps(self.input_params)
-        except (TypeError, json.JSONDecodeError) as e:
-            logging.error(f"Failed to serialize params to JSON: {e}")
+            if orjson:
+                self._cached_json_bytes = orjson.dumps(self.input_params)
+            else:
+                self._cached_json_bytes = json.dumps(self.input_params).encode('utf-8')
+        except TypeError as e:  # orjson.JSONEncodeError is a TypeError too
+            logging.error("Failed to serialize params to JSON: %s", e)
             return {'status': 'failure', 'message': f"Failed to serialize input params: {e}"}
+        return self._cached_json_bytes
+
+    def get_params_json(self) -> str | dict:
+        '''Get the FLCore parameters as a JSON string.'''
+        if self._cached_json is None:
+            params_json = self.get_params_json_bytes()
+            if isinstance(params_json, dict):
+                return params_json
+            self._cached_json = params_json.decode('utf-8')
+        return self._cached_json
+
+    def invalidate_cache(self) -> None:
+        '''Drop the cached JSON. Call after modifying input_params in place.'''
+        self._cached_json = None
+        self._cached_json_bytes = None
@@ -83,17 +83,12 @@ def load_env_file(env_path: str):
     logger.info(f"Loading environment variables from {env_path}")
 
     with open(env_path, "r", encoding="utf-8") as f:
-        for line in f:
-            line = line.strip()
-            if not line or line.startswith("#"):
-                continue
-            if "=" not in line:
-                continue
-            key, value = line.split("=", 1)
-            key = key.strip()
-            value = value.strip().strip('"').strip("'")
-            os.environ[key] = value
-            logger.info(f" - set environment variable: {key}")
+        lines = (line.strip() for line in f)
+        pairs = (line.split("=", 1) for line in lines if line and not line.startswith("#") and "=" in line)
+        env = {key.strip(): value.strip().strip('"').strip("'") for key, value in pairs}
+
+    os.environ.update(env)
+    logger.info(" - set environment variables: {}", ", ".join(env))
 
 
 def main_wrapper(config_path, in_metadata_path, out_metadata_path):
@@ -20,10 +20,14 @@ import pathlib
 import sys
 import subprocess
 import time
-from glob import glob
 import shutil
 import json
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 from basic_modules.tool import Tool
 from utils import logger
 
@@ -33,6 +37,13 @@ from tool.flcore_params  import FlcoreParams, FlcoreDataset
 #from tool.generate_flcore_report import FLCoreLogParser
 
 
+def _pretty_json(obj):
+    """Indented JSON for log messages, with orjson when available"""
+    if orjson:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode('utf-8')
+    return json.dumps(obj, indent=2)
+
+
 class myTool( Tool ):
     """
     """
@@ -63,6 +74,11 @@ class myTool( Tool ):
                 elif v.strip().lower() in ('false', 'no', '0', ''):
                     self.configuration[k] = False
 
+        # Client nodes come as a comma separated string, split them once here
+        client_node_list = self.configuration.get('client_node_list')
+        if isinstance(client_node_list, str):
+            self.configuration['client_node_list'] = [c.strip() for c in client_node_list.split(',') if c.strip()]
+
         # Init variables
         self.current_dir = os.path.abspath(os.path.dirname(__file__))
         self.parent_dir = os.path.abspath(self.current_dir + "/../")
@@ -92,18 +108,16 @@ class myTool( Tool ):
         try:
             # -- Set and validate working directory --
 
-            # If not exists the directory will be created
-            os.makedirs(self.execution_path, exist_ok=True)
-            # Set parent directory. If not exists the directory will be created
-            execution_parent_dir = os.path.dirname(self.execution_path)
-            os.makedirs(execution_parent_dir, exist_ok=True)
+            execution_path = self.execution_path
+            # If not exists the directory will be created, parents included
+            os.makedirs(execution_path, exist_ok=True)
             # Update working directory to execution path
-            os.chdir(self.execution_path)
+            os.chdir(execution_path)
 
 
             # -- Running Wrapped Tool ---
 
-            self.run_flcore_demo(input_files, self.execution_path)
+            self.run_flcore_demo(input_files, execution_path)
 
 
             # -- Validate expected outputs ---
@@ -116,6 +130,18 @@ class myTool( Tool ):
                 if file_type and not file_path:
                     output_metadata_by_file_type.setdefault(file_type, []).append(output.get("name"))
 
+            # Index the working directory once, by file name and by extension, instead of
+            # stat-ing or globbing it per output
+            files_present = set()
+            files_by_ext = {}
+            with os.scandir(execution_path) as entries:
+                for entry in entries:
+                    if not entry.is_file():
+                        continue
+                    files_present.add(entry.name)
+                    if not entry.name.startswith('.') and '.' in entry.name:
+                        files_by_ext.setdefault(entry.name.rsplit('.', 1)[1], []).append(entry.path)
+
             # Guessing and validating output file paths
             validated_outputs = {} # contain validated  outputs
             logger.info("Looking for the expected output files in the working directory...")
@@ -128,8 +154,8 @@ class myTool( Tool ):
 
                 # based on the given filename
                 if output_filename:
-                    output_file_path = os.path.join(self.execution_path, output_filename)
-                    if os.path.isfile(output_file_path):
+                    output_file_path = os.path.join(execution_path, output_filename)
+                    if output_filename in files_present or (os.sep in output_filename and os.path.isfile(output_file_path)):
                         #logger.info(" - Output {}: file found".format(output_id))
                         logger.info(f" - Output {output_id}: file found ({output_file_path})")
                         validated_outputs[output_id] = [(output_file_path, "file")]
@@ -146,7 +172,7 @@ class myTool( Tool ):
                         logger.warning(f" - Output {output_id}: no file_type defined, skipping.")
                         continue
 
-                    matching_outputs = glob(os.path.join(self.execution_path, f"*.{output_file_type.lower()}"))
+                    matching_outputs = files_by_ext.get(output_file_type.lower(), [])
 
                     # not found in disk
                     if not matching_outputs:
@@ -166,7 +192,7 @@ class myTool( Tool ):
                     found= False
                     if output_file_type.upper() == "TXT":
                         server_node = self.configuration.get("server_node")
-                        expected_server_log = os.path.join(self.execution_path, f"{server_node}_log_server.txt")
+                        expected_server_log = os.path.join(execution_path, f"{server_node}_log_server.txt")
 
                         if output_id == "server_log" and expected_server_log in matching_outputs:
                             logger.info(f" - Output {output_id}: found server log ({expected_server_log})")
@@ -174,21 +200,23 @@ class myTool( Tool ):
                             found = True
 
                         if output_id == "client_log":
-                            clients = self.configuration.get("client_node_list", [])
-                            if isinstance(clients, str):
-                                clients = [c.strip() for c in clients.split(",") if c.strip()]
+                            clients = self.configuration.get("client_node_list") or []
+                            matching_set = set(matching_outputs)
+                            client_logs = []
                             for client in clients:
-                                expected_client_log = os.path.join(self.execution_path, f"{client}_log_client.txt")
-                                if expected_client_log in matching_outputs:
+                                expected_client_log = os.path.join(execution_path, f"{client}_log_client.txt")
+                                if expected_client_log in matching_set:
                                     logger.info(f" - Output {output_id}: found client log ({expected_client_log})")
-                                    #validated_outputs[f"{output_id}_{client}"] = [(expected_client_log, "file")]
-                                    validated_outputs[f"{output_id}"] = [(expected_client_log, "file")]
-                                    found = True
+                                    client_logs.append((expected_client_log, "file"))
+                            if client_logs:
+                                # Keep every client log, not only the last one found
+                                validated_outputs[output_id] = client_logs
+                                found = True
 
                         if not found:
                             logger.warning(f" - Output {output_id}: no matching file found for type {file_type}")
 
-            logger.info("Validated outputs = {}", json.dumps(validated_outputs, indent=2))
+            logger.info("Validated outputs = {}", _pretty_json(validated_outputs))
 
             return validated_outputs, output_metadata
 
@@ -284,32 +312,29 @@ class myTool( Tool ):
             dest_dir = output_file_path
             os.makedirs(dest_dir, exist_ok=True)
 
-            # Copy report
-            src_report = os.path.join(tests_dir, "flcore_report.html")
-            dst_report = os.path.join(dest_dir, "flcore_report.html")
-            shutil.copy2(src_report, dst_report)
-            logger.info(f"-- Copied {src_report} → {dst_report}")
+            # Files to copy, as (source, destination) pairs
+            copies = []
+
+            # Report
+            copies.append((os.path.join(tests_dir, "flcore_report.html"), os.path.join(dest_dir, "flcore_report.html")))
 
-            # Copy server log
+            # Server log
             server_node = self.configuration['server_node']
-            src_server_log = os.path.join(tests_dir, "BSC_log_server.txt")
-            dst_server_log = os.path.join(dest_dir, f"{server_node}_log_server.txt")
-            shutil.copy2(src_server_log, dst_server_log)
-            logger.info(f"-- Copied {src_server_log} → {dst_server_log}")
-
-            # Copy client logs
-            for src_client_log in glob(os.path.join(tests_dir, "*_log_client.txt")):
-                logName = os.path.basename(src_client_log)
-                dst_client_log = os.path.join(dest_dir,logName)
-                shutil.copy2(src_client_log, dst_client_log)
-                logger.info(f"-- Copied {src_client_log} → {dst_client_log}")
-
-            # Copy health check file if requested
+            copies.append((os.path.join(tests_dir, "BSC_log_server.txt"), os.path.join(dest_dir, f"{server_node}_log_server.txt")))
+
+            # Client logs
+            with os.scandir(tests_dir) as entries:
+                for entry in entries:
+                    if entry.name.endswith("_log_client.txt") and not entry.name.startswith('.'):
+                        copies.append((entry.path, os.path.join(dest_dir, entry.name)))
+
+            # Health check file if requested
             if do_check_health:
-                src_health = os.path.join(tests_dir, "health_check.json")
-                dst_health = os.path.join(dest_dir, "health_check.json")
-                shutil.copy2(src_health, dst_health)
-                logger.info(f"-- Copied {src_health} → {dst_health}")
+                copies.append((os.path.join(tests_dir, "health_check.json"), os.path.join(dest_dir, "health_check.json")))
+
+            for src, dst in copies:
+                shutil.copy2(src, dst)
+                logger.info(f"-- Copied {src} → {dst}")
 
             return {
                 "status": "success",
@@ -4,7 +4,11 @@ FLCore Federated Learning Report Generator
 This script parses FLCore server logs and generates an interactive HTML report
 with charts, metrics, and detailed analysis.
 """
+import mmap
 import re
+import string
+import functools
+import gzip
 import json
 import sys
 import os
@@ -12,6 +16,97 @@ from datetime import datetime
 from typing import Dict, List, Tuple, Optional
 from utils import logger
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Log line and message patterns, compiled once at import
+# (the log record pattern runs over the raw bytes of the file)
+_LOG_RE = re.compile(rb'^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2},\d{3}) - (\w+) - (\w+) - (.+)', re.MULTILINE)
+_NUM_ROUNDS_RE = re.compile(r'num_rounds=(\d+)')
+_FL_FINISHED_RE = re.compile(r'FL finished in ([\d.]+)')
+# (round, value) tuples printed by Flower, e.g. (1, 0.5265151560306549) or (2, 1.2e-05)
+_TUPLE_RE = re.compile(r'\((\d+), ([-\d.eE+]+)\)')
+_CLIENT_RE = re.compile(r'Client (ipv4:[\d.:]+)')
+
+_EVAL_METRICS = ('accuracy', 'precision', 'recall', 'f1', 'specificity', 'balanced_accuracy')
+# CSS class of a log entry by level; levels without their own style show as info
+_LEVEL_CLASS = {
+    'DEBUG': 'log-debug',
+    'INFO': 'log-info',
+    'WARNING': 'log-warning',
+    'ERROR': 'log-error',
+    'CRITICAL': 'log-error'
+}
+# Longest series drawn point by point, longer runs are reduced to per-bucket min/max
+_MAX_CHART_POINTS = 2000
+# Longest line chart still drawn with a marker per round
+_MAX_MARKED_POINTS = 100
+# Per-round columns of the metrics table, in display order
+_TABLE_FIELDS = ('loss', 'accuracy', 'precision', 'recall', 'f1', 'training_time')
+# Any of the evaluation metric keys followed by its list of (round, value) tuples.
+# Starts with the literal quote so the engine can scan for it before trying the names.
+_METRICS_RE = re.compile(rf"'({'|'.join(_EVAL_METRICS)})':\s*\[([^\]]+)\]")
+
+
+def _to_json(obj) -> str:
+    """Serialize chart data for embedding in the page, with orjson when available"""
+    if orjson:
+        return orjson.dumps(obj).decode('utf-8')
+    return json.dumps(obj)
+
+
+@functools.lru_cache(maxsize=8)
+def _round_labels_json(n_rounds: int) -> str:
+    """Chart labels for n_rounds rounds, serialized once per round count"""
+    return _to_json([f'Round {i}' for i in range(1, n_rounds + 1)])
+
+
+def _decimate(values: List[float], max_points: int = _MAX_CHART_POINTS) -> List[int]:
+    """Indices of the points to plot: all of them, or each bucket's min and max for long series"""
+    n = len(values)
+    if n <= max_points:
+        return list(range(n))
+    n_buckets = max_points // 2
+    kept = []
+    for b in range(n_buckets):
+        bucket = range(b * n // n_buckets, (b + 1) * n // n_buckets)
+        i_min = min(bucket, key=values.__getitem__)
+        i_max = max(bucket, key=values.__getitem__)
+        kept.extend(sorted({i_min, i_max}))
+    return kept
+
+
+def _series_json(values: List[float]) -> Tuple[str, str]:
+    """Round labels and values of a chart series as JSON, decimated when too long to draw"""
+    kept = _decimate(values)
+    if len(kept) == len(values):
+        return _round_labels_json(len(values)), _to_json(values)
+    return _to_json([f'Round {i + 1}' for i in kept]), _to_json([values[i] for i in kept])
+
+
+def _pad_edge(values: List[float], length: int) -> List[float]:
+    """Pad a non-empty series up to length by repeating its last value"""
+    missing = length - len(values)
+    return values + [values[-1]] * missing if missing > 0 else values
+
+
+def _round_values(text: str) -> List[Tuple[int, float]]:
+    """(round, value) tuples found in text"""
+    return [(int(round_num), float(value)) for round_num, value in _TUPLE_RE.findall(text)]
+
+
+def _values(series: List[Tuple[int, float]]) -> List[float]:
+    """Values of a list of (round, value) tuples"""
+    return [value for _, value in series]
+
+
+def _has_rounds(rounds: int, *series: List) -> bool:
+    """Whether every series already holds at least rounds values"""
+    return all(len(values) >= rounds for values in series)
+
+
 class FLCoreLogParser:
     """Parser for FLCore federated learning server logs"""
     
@@ -27,119 +122,83 @@ class FLCoreLogParser:
         
     def parse_logs(self) -> Dict:
         """Parse the log file and extract metrics"""
-        with open(self.log_file, 'r', encoding='utf-8') as f:
-            content = f.read()
-            
-        # Parse individual log lines
-        log_pattern = r'(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2},\d{3}) - (\w+) - (\w+) - (.+)'
-        
-        for match in re.finditer(log_pattern, content):
-            timestamp, logger, level, message = match.groups()
-            self.logs.append({
-                'timestamp': timestamp,
-                'logger': logger,
-                'level': level,
-                'message': message
-            })
-        
-        # Extract key information
-        self._extract_basic_info()
-        self._extract_metrics_from_logs()
-        self._extract_clients()
+        # One finditer over the memory-mapped file instead of a Python loop per
+        # line; lines that are not log records (tracebacks, continuation lines)
+        # are skipped by the regex and never decoded.
+        with open(self.log_file, 'rb') as f:
+            if os.fstat(f.fileno()).st_size:
+                append = self.logs.append
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+                    for match in _LOG_RE.finditer(buf):
+                        timestamp, logger, level, message = match.groups()
+                        append({
+                            'timestamp': timestamp.decode('ascii'),
+                            'logger': logger.decode('ascii'),
+                            'level': level.decode('ascii'),
+                            'message': message.decode('utf-8', 'replace')
+                        })
+        
+        self._scan_logs()
         
         return self._compile_results()
     
-    def _extract_basic_info(self):
-        """Extract basic training information"""
-        for log in self.logs:
-            msg = log['message']
-            
-            # Extract number of rounds
-            if 'num_rounds=' in msg:
-                match = re.search(r'num_rounds=(\d+)', msg)
-                if match:
-                    self.rounds = int(match.group(1))
-            
-            # Extract start time
-            if 'FL starting' in msg:
-                self.start_time = log['timestamp']
-            
-            # Extract end time and duration
-            if 'FL finished in' in msg:
-                self.end_time = log['timestamp']
-                match = re.search(r'FL finished in ([\d.]+)', msg)
-                if match:
-                    self.total_duration = float(match.group(1))
-    
-    def _extract_metrics_from_logs(self):
-        """Extract training metrics from logs"""
+    def _scan_logs(self):
+        """Extract basic info, metrics and clients in a single pass over the logs"""
         losses = []
         training_times = []
-        eval_metrics = {
-            'accuracy': [],
-            'precision': [],
-            'recall': [],
-            'f1': [],
-            'specificity': [],
-            'balanced_accuracy': []
-        }
+        eval_metrics = {metric: [] for metric in _EVAL_METRICS}
+        client_msgs = []
         
+        client_append = client_msgs.append
         for log in self.logs:
             msg = log['message']
-            
-            # Extract losses
-            if 'losses_distributed' in msg:
-                pattern = r'\[(\d+), ([\d.]+)\]'
-                for match in re.finditer(pattern, msg):
-                    round_num, loss = match.groups()
-                    losses.append((int(round_num), float(loss)))
-            
-            # Extract training times
-            if 'training_time [s]' in msg:
-                pattern = r'\((\d+), ([\d.]+)\)'
-                for match in re.finditer(pattern, msg):
-                    round_num, time_val = match.groups()
-                    training_times.append((int(round_num), float(time_val)))
-            
-            # Extract evaluation metrics
-            for metric in eval_metrics.keys():
-                if f"'{metric}':" in msg:
-                    pattern = rf"'{metric}':[^[]*\[([^]]+)\]"
-                    match = re.search(pattern, msg)
-                    if match:
-                        values_str = match.group(1)
+            # Cheap substring checks first, regexes only on the matching lines.
+            # Ordered by how often they hit: client lines come every round,
+            # the metric dicts and the rest only show up once or twice.
+            if 'ipv4:' in msg:
+                client_append(msg)
+            elif "': [" in msg:
+                if 'training_time [s]' in msg:
+                    training_times.extend(_round_values(msg))
+                else:
+                    for metric, values_str in _METRICS_RE.findall(msg):
                         # Parse tuples like (1, 0.5265151560306549), (2, 0.5325757563114166)
-                        tuple_pattern = r'\((\d+), ([\d.]+)\)'
-                        for tuple_match in re.finditer(tuple_pattern, values_str):
-                            round_num, value = tuple_match.groups()
-                            eval_metrics[metric].append((int(round_num), float(value)))
+                        eval_metrics[metric].extend(_round_values(values_str))
+            elif 'losses_distributed' in msg:
+                losses.extend(_round_values(msg))
+            elif 'FL finished in' in msg:
+                self.end_time = log['timestamp']
+                match = _FL_FINISHED_RE.search(msg)
+                if match:
+                    self.total_duration = float(match.group(1))
+            elif 'num_rounds=' in msg:
+                match = _NUM_ROUNDS_RE.search(msg)
+                if match:
+                    self.rounds = int(match.group(1))
+            elif 'FL starting' in msg:
+                self.start_time = log['timestamp']
+            
+            # After "FL finished" Flower only prints the run history, repeatedly.
+            # Stop as soon as every series holds all the rounds.
+            if self.end_time is not None and _has_rounds(self.rounds, losses, training_times, *eval_metrics.values()):
+                break
         
+        # One regex pass over the client lines instead of one per line
+        self.clients = set(_CLIENT_RE.findall('\n'.join(client_msgs)))
         self.metrics = {
-            'losses': losses,
-            'training_times': training_times,
-            'eval_metrics': eval_metrics
+            'losses': losses[:self.rounds],
+            'training_times': training_times[:self.rounds],
+            'eval_metrics': {metric: values[:self.rounds] for metric, values in eval_metrics.items()}
         }
     
-    def _extract_clients(self):
-        """Extract client information"""
-        for log in self.logs:
-            msg = log['message']
-            
-            # Extract client IPs
-            client_pattern = r'Client (ipv4:[\d.:]+)'
-            matches = re.findall(client_pattern, msg)
-            for client in matches:
-                self.clients.add(client)
-    
     def _compile_results(self) -> Dict:
         """Compile all extracted data into a structured format"""
         # Get final metrics (last round)
-        final_metrics = {}
-        for metric, values in self.metrics['eval_metrics'].items():
-            if values:
-                final_metrics[metric] = values[-1][1] if values else 0
+        metrics = self.metrics
+        final_metrics = {metric: values[-1][1] for metric, values in metrics['eval_metrics'].items() if values}
         
-        final_loss = self.metrics['losses'][-1][1] if self.metrics['losses'] else 0
+        losses = metrics['losses']
+        final_loss = losses[-1][1] if losses else 0
         
         return {
             'basic_info': {
@@ -152,70 +211,24 @@ class FLCoreLogParser:
                 'end_time': self.end_time
             },
             'clients': list(self.clients),
-            'metrics': self.metrics,
+            'metrics': metrics,
             'final_metrics': final_metrics,
             'logs': self.logs
         }
 
 
-class HTMLReportGenerator:
-    """Generate HTML report from parsed FLCore logs"""
-    
-    def __init__(self, data: Dict):
-        self.data = data
-    
-    def generate_html(self, output_file: str = 'flwr_report.html'):
-        """Generate the complete HTML report"""
-        html_content = self._generate_html_structure()
-        
-        with open(output_file, 'w', encoding='utf-8') as f:
-            f.write(html_content)
-        
-        logger.info(f"✅ Report generated successfully: {output_file}")
-    
-    def _generate_html_structure(self) -> str:
-        """Generate the complete HTML structure"""
-        return f"""<!DOCTYPE html>
+# Static parts of the report, built once at import
+_HTML_HEAD = """<!DOCTYPE html>
 <html lang="en">
 <head>
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>FLCore Federated Learning - Training Report</title>
     <script src="https://cdn.jsdelivr.net/npm/chart.js"></script>
-    {self._generate_css()}
-</head>
-<body>
-    <div class="container">
-        {self._generate_header()}
-        {self._generate_summary_cards()}
-        {self._generate_progress_section()}
-        {self._generate_charts_section()}
-        {self._generate_client_info()}
-        {self._generate_metrics_table()}
-        {self._generate_logs_section()}
-        {self._generate_insights()}
-    </div>
-    
-    <footer class="bannerEU">
-        <div class="container">
-            <div style="text-align: center; padding: 20px; display: flex; align-items: center; justify-content: center; gap: 15px;">
-                <img src="data:image/svg+xml;base64,PHN2ZyB3aWR0aD0iNDAiIGhlaWdodD0iMzAiIHZpZXdCb3g9IjAgMCA0MCAzMCIgZmlsbD0ibm9uZSIgeG1sbnM9Imh0dHA6Ly93d3cudzMub3JnLzIwMDAvc3ZnIj4KPHJlY3Qgd2lkdGg9IjQwIiBoZWlnaHQ9IjMwIiBmaWxsPSIjMDAzMzk5Ii8+CjxjaXJjbGUgY3g9IjIwIiBjeT0iMTUiIHI9IjgiIGZpbGw9Im5vbmUiIHN0cm9rZT0iI0ZGRkZGRiIgc3Ryb2tlLXdpZHRoPSIwLjUiLz4KPGNpcmNsZSBjeD0iMjAiIGN5PSI3IiByPSIxIiBmaWxsPSIjRkZGRkZGIi8+CjxjaXJjbGUgY3g9IjI0LjMzIiBjeT0iOC41IiByPSIxIiBmaWxsPSIjRkZGRkZGIi8+CjxjaXJjbGUgY3g9IjI3IiBjeT0iMTIiIHI9IjEiIGZpbGw9IiNGRkZGRkYiLz4KPGNpcmNsZSBjeD0iMjcuNSIgY3k9IjE2IiByPSIxIiBmaWxsPSIjRkZGRkZGIi8+CjxjaXJjbGUgY3g9IjI2IiBjeT0iMjAiIHI9IjEiIGZpbGw9IiNGRkZGRkYiLz4KPGNpcmNsZSBjeD0iMjMiIGN5PSIyMiIgcj0iMSIgZmlsbD0iI0ZGRkZGRiIvPgo8Y2lyY2xlIGN4PSIyMCIgY3k9IjIzIiByPSIxIiBmaWxsPSIjRkZGRkZGIi8+CjxjaXJjbGUgY3g9IjE3IiBjeT0iMjIiIHI9IjEiIGZpbGw9IiNGRkZGRkYiLz4KPGNpcmNsZSBjeD0iMTQiIGN5PSIyMCIgcj0iMSIgZmlsbD0iI0ZGRkZGRiIvPgo8Y2lyY2xlIGN4PSIxMi41IiBjeT0iMTYiIHI9IjEiIGZpbGw9IiNGRkZGRkYiLz4KPGNpcmNsZSBjeD0iMTMiIGN5PSIxMiIgcj0iMSIgZmlsbD0iI0ZGRkZGRiIvPgo8Y2lyY2xlIGN4PSIxNS42NyIgY3k9IjguNSIgcj0iMSIgZmlsbD0iI0ZGRkZGRiIvPgo8L3N2Zz4K" alt="European Union Flag" style="height: 24px; width: auto;">
-                <div style="text-align: left;">
-                    <p style="margin: 5px 0 0 0; font-size: 12px; opacity: 0.8;">
-                        This project has received funding from the European Union's Horizon 2020 research and innovation programme under grant agreement No 101016496.
-                    </p>
-                </div>
-            </div>
-        </div>
-    </footer>
-    
-    {self._generate_javascript()}
-</body>
-</html>"""
-    
-    def _generate_css(self) -> str:
-        """Generate CSS styles matching DataTools4Heart BSC branding"""
-        return """
+    """
+
+# CSS styles matching DataTools4Heart BSC branding
+_CSS = """
     <style>
         @import url('https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700&display=swap');
         
@@ -583,46 +596,8 @@ class HTMLReportGenerator:
             }
         }
     </style>"""
-    
-    def _generate_header(self) -> str:
-        """Generate header section"""
-        current_date = datetime.now().strftime("%B %d, %Y")
-        return f"""
-        <div class="header">
-            <h1><img src="https://fl.datatools4heart.bsc.es/assets/layouts/layout/img/logo.png" alt="DataTools4Heart Logo" style="height: 50px;"> FLCore Federated Learning Report</h1>
-            <div class="subtitle">Training Session - {current_date} | FLCore Analytics Dashboard</div>
-        </div>"""
-    
-    def _generate_summary_cards(self) -> str:
-        """Generate summary cards section"""
-        info = self.data['basic_info']
-        return f"""
-        <div class="summary-grid">
-            <div class="summary-card">
-                <h3>Total Rounds</h3>
-                <div class="value">{info['rounds']}</div>
-            </div>
-            <div class="summary-card">
-                <h3>Active Clients</h3>
-                <div class="value">{info['clients']}</div>
-            </div>
-            <div class="summary-card">
-                <h3>Training Duration</h3>
-                <div class="value">{info['duration']:.2f}s</div>
-            </div>
-            <div class="summary-card">
-                <h3>Final Loss</h3>
-                <div class="value">{info['final_loss']:.4f}</div>
-            </div>
-            <div class="summary-card">
-                <h3>Final Accuracy</h3>
-                <div class="value">{info['final_accuracy']:.2f}%</div>
-            </div>
-        </div>"""
-    
-    def _generate_progress_section(self) -> str:
-        """Generate progress section"""
-        return """
+
+_PROGRESS_HTML = """
         <div class="section">
             <h2>📊 Training Progress</h2>
             <div class="progress-bar">
@@ -630,10 +605,8 @@ class HTMLReportGenerator:
             </div>
             <p><span class="badge status-success">COMPLETED</span> Federated learning completed successfully</p>
         </div>"""
-    
-    def _generate_charts_section(self) -> str:
-        """Generate charts section"""
-        return """
+
+_CHARTS_HTML = """
         <div class="charts-grid">
             <div class="chart-container">
                 <h3>Loss Over Rounds</h3>
@@ -652,63 +625,137 @@ class HTMLReportGenerator:
                 <canvas id="metricsChart"></canvas>
             </div>
         </div>"""
-    
-    def _generate_client_info(self) -> str:
-        """Generate client information section"""
-        clients_html = ""
-        for i, client in enumerate(self.data['clients'], 1):
-            client_type = "Docker Network Client" if "172.17.0.1" in client else "External Network Client"
-            clients_html += f"""
+
+_FOOTER_HTML = """    <footer class="bannerEU">
+        <div class="container">
+            <div style="text-align: center; padding: 20px; display: flex; align-items: center; justify-content: center; gap: 15px;">
+                <img src="data:image/svg+xml;base64,PHN2ZyB3aWR0aD0iNDAiIGhlaWdodD0iMzAiIHZpZXdCb3g9IjAgMCA0MCAzMCIgZmlsbD0ibm9uZSIgeG1sbnM9Imh0dHA6Ly93d3cudzMub3JnLzIwMDAvc3ZnIj4KPHJlY3Qgd2lkdGg9IjQwIiBoZWlnaHQ9IjMwIiBmaWxsPSIjMDAzMzk5Ii8+CjxjaXJjbGUgY3g9IjIwIiBjeT0iMTUiIHI9IjgiIGZpbGw9Im5vbmUiIHN0cm9rZT0iI0ZGRkZGRiIgc3Ryb2tlLXdpZHRoPSIwLjUiLz4KPGNpcmNsZSBjeD0iMjAiIGN5PSI3IiByPSIxIiBmaWxsPSIjRkZGRkZGIi8+CjxjaXJjbGUgY3g9IjI0LjMzIiBjeT0iOC41IiByPSIxIiBmaWxsPSIjRkZGRkZGIi8+CjxjaXJjbGUgY3g9IjI3IiBjeT0iMTIiIHI9IjEiIGZpbGw9IiNGRkZGRkYiLz4KPGNpcmNsZSBjeD0iMjcuNSIgY3k9IjE2IiByPSIxIiBmaWxsPSIjRkZGRkZGIi8+CjxjaXJjbGUgY3g9IjI2IiBjeT0iMjAiIHI9IjEiIGZpbGw9IiNGRkZGRkYiLz4KPGNpcmNsZSBjeD0iMjMiIGN5PSIyMiIgcj0iMSIgZmlsbD0iI0ZGRkZGRiIvPgo8Y2lyY2xlIGN4PSIyMCIgY3k9IjIzIiByPSIxIiBmaWxsPSIjRkZGRkZGIi8+CjxjaXJjbGUgY3g9IjE3IiBjeT0iMjIiIHI9IjEiIGZpbGw9IiNGRkZGRkYiLz4KPGNpcmNsZSBjeD0iMTQiIGN5PSIyMCIgcj0iMSIgZmlsbD0iI0ZGRkZGRiIvPgo8Y2lyY2xlIGN4PSIxMi41IiBjeT0iMTYiIHI9IjEiIGZpbGw9IiNGRkZGRkYiLz4KPGNpcmNsZSBjeD0iMTMiIGN5PSIxMiIgcj0iMSIgZmlsbD0iI0ZGRkZGRiIvPgo8Y2lyY2xlIGN4PSIxNS42NyIgY3k9IjguNSIgcj0iMSIgZmlsbD0iI0ZGRkZGRiIvPgo8L3N2Zz4K" alt="European Union Flag" style="height: 24px; width: auto;">
+                <div style="text-align: left;">
+                    <p style="margin: 5px 0 0 0; font-size: 12px; opacity: 0.8;">
+                        This project has received funding from the European Union's Horizon 2020 research and innovation programme under grant agreement No 101016496.
+                    </p>
+                </div>
+            </div>
+        </div>
+    </footer>"""
+
+
+# Dynamic sections, filled with str.format / format_map
+_HEADER_TMPL = """
+        <div class="header">
+            <h1><img src="https://fl.datatools4heart.bsc.es/assets/layouts/layout/img/logo.png" alt="DataTools4Heart Logo" style="height: 50px;"> FLCore Federated Learning Report</h1>
+            <div class="subtitle">Training Session - {date} | FLCore Analytics Dashboard</div>
+        </div>"""
+
+_SUMMARY_TMPL = """
+        <div class="summary-grid">
+            <div class="summary-card">
+                <h3>Total Rounds</h3>
+                <div class="value">{rounds}</div>
+            </div>
+            <div class="summary-card">
+                <h3>Active Clients</h3>
+                <div class="value">{clients}</div>
+            </div>
+            <div class="summary-card">
+                <h3>Training Duration</h3>
+                <div class="value">{duration}s</div>
+            </div>
+            <div class="summary-card">
+                <h3>Final Loss</h3>
+                <div class="value">{final_loss}</div>
+            </div>
+            <div class="summary-card">
+                <h3>Final Accuracy</h3>
+                <div class="value">{final_accuracy}%</div>
+            </div>
+        </div>"""
+
+_INSIGHTS_TMPL = """
+        <div class="section">
+            <h2>Key Insights</h2>
+            <ul style="font-size: 1.1em; line-height: 1.8;">
+                <li><strong>Training Stability:</strong> Training completed with {rounds} rounds</li>
+                <li><strong>Client Participation:</strong> {clients} clients participated in the training</li>
+                <li><strong>Performance Metrics:</strong> Final accuracy reached {final_accuracy}%</li>
+                <li><strong>Training Efficiency:</strong> Total training completed in {duration} seconds</li>
+                <li><strong>Final Loss:</strong> Training converged to loss value of {final_loss}</li>
+            </ul>
+        </div>"""
+
+# Chart.js setup shared by the four charts
+_JS_HEAD = """
+    <script>
+        // DataTools4Heart color palette
+        const dt4hColors = {
+            primary: '#ae0d1b',
+            secondary: '#8b0a15',
+            accent: '#d42434',
+            success: '#28a745',
+            warning: '#ffc107',
+            danger: '#dc3545'
+        };
+
+        // Chart.js default configuration
+        Chart.defaults.font.family = 'Inter, sans-serif';
+        Chart.defaults.font.size = 12;
+        Chart.defaults.color = '#495057';
+
+        // Options shared by all the charts, each one adds its own scales
+        const dt4hBaseOptions = {
+            responsive: true,
+            animation: false,
+            normalized: true,
+            plugins: {
+                legend: {
+                    labels: {
+                        usePointStyle: true,
+                        font: {
+                            weight: 600
+                        }
+                    }
+                }
+            }
+        };
+        const dt4hAxis = {
+            grid: {
+                color: '#e9ecef'
+            },
+            ticks: {
+                color: '#6c757d'
+            }
+        };
+
+"""
+
+_CLIENT_CARD_TMPL = """
                 <div class="client-card">
-                    <h4>Client {i}: {client.replace('ipv4:', '')}</h4>
+                    <h4>Client {index}: {address}</h4>
                     <p><strong>Type:</strong> {client_type}</p>
                     <p><strong>Samples per Round:</strong> 660</p>
                     <p><strong>Status:</strong> <span class="badge status-success">Active</span></p>
                 </div>"""
-        
-        return f"""
+
+_CLIENT_INFO_TMPL = """
         <div class="section">
             <h2>🏥 Client Information</h2>
             <div class="client-info">
                 {clients_html}
             </div>
         </div>"""
-    
-    def _generate_metrics_table(self) -> str:
-        """Generate metrics table"""
-        rows = ""
-        metrics = self.data['metrics']
-        
-        # Combine data by rounds
-        rounds_data = {}
-        
-        for round_num, loss in metrics['losses']:
-            rounds_data[round_num] = {'loss': loss}
-        
-        for metric, values in metrics['eval_metrics'].items():
-            for round_num, value in values:
-                if round_num not in rounds_data:
-                    rounds_data[round_num] = {}
-                rounds_data[round_num][metric] = value
-        
-        for round_num, training_time in metrics['training_times']:
-            if round_num in rounds_data:
-                rounds_data[round_num]['training_time'] = training_time
-        
-        for round_num in sorted(rounds_data.keys()):
-            data = rounds_data[round_num]
-            rows += f"""
+
+_METRICS_ROW_TMPL = """
                 <tr>
                     <td>{round_num}</td>
-                    <td>{data.get('loss', 0):.4f}</td>
-                    <td>{data.get('accuracy', 0)*100:.2f}%</td>
-                    <td>{data.get('precision', 0)*100:.2f}%</td>
-                    <td>{data.get('recall', 0)*100:.2f}%</td>
-                    <td>{data.get('f1', 0)*100:.2f}%</td>
-                    <td>{data.get('training_time', 0):.2f}</td>
+                    <td>{loss:.4f}</td>
+                    <td>{accuracy:.2f}%</td>
+                    <td>{precision:.2f}%</td>
+                    <td>{recall:.2f}%</td>
+                    <td>{f1:.2f}%</td>
+                    <td>{training_time:.2f}</td>
                 </tr>"""
-        
-        return f"""
+
+_METRICS_TABLE_TMPL = """
         <div class="section">
             <h2>📈 Detailed Metrics by Round</h2>
             <table class="metric-table">
@@ -728,271 +775,96 @@ class HTMLReportGenerator:
                 </tbody>
             </table>
         </div>"""
-    
-    def _generate_logs_section(self) -> str:
-        """Generate logs section"""
-        log_entries = ""
-        
-        # Show first 10 and last 5 log entries
-        selected_logs = self.data['logs'][:10] + self.data['logs'][-5:]
-        
-        for log in selected_logs:
-            level_class = f"log-{log['level'].lower()}"
-            log_entries += f"""
+
+_LOG_ENTRY_TMPL = """
                 <div class="log-entry {level_class}">
-                    <span class="timestamp">{log['timestamp']}</span> - {log['logger']} - {log['level']} - {log['message']}
+                    <span class="timestamp">{timestamp}</span> - {logger} - {level} - {message}
                 </div>"""
-        
-        return f"""
+
+_LOGS_SECTION_TMPL = """
         <div class="section">
             <h2>📋 Server Log Details (Sample)</h2>
             <div class="log-section">
                 {log_entries}
             </div>
         </div>"""
-    
-    def _generate_insights(self) -> str:
-        """Generate insights section"""
-        info = self.data['basic_info']
-        return f"""
-        <div class="section">
-            <h2>Key Insights</h2>
-            <ul style="font-size: 1.1em; line-height: 1.8;">
-                <li><strong>Training Stability:</strong> Training completed with {info['rounds']} rounds</li>
-                <li><strong>Client Participation:</strong> {info['clients']} clients participated in the training</li>
-                <li><strong>Performance Metrics:</strong> Final accuracy reached {info['final_accuracy']:.2f}%</li>
-                <li><strong>Training Efficiency:</strong> Total training completed in {info['duration']:.2f} seconds</li>
-                <li><strong>Final Loss:</strong> Training converged to loss value of {info['final_loss']:.4f}</li>
-            </ul>
-        </div>"""
-    
-    def _generate_javascript(self) -> str:
-        """Generate JavaScript for charts"""
-        # Prepare data for JavaScript with safety checks
-        metrics = self.data.get('metrics', {})
-        
-        # Extract losses with fallback
-        losses_data = metrics.get('losses', [])
-        losses = [loss for _, loss in losses_data] if losses_data else [0.0]
-        
-        # Extract accuracies with fallback
-        eval_metrics = metrics.get('eval_metrics', {})
-        accuracy_data = eval_metrics.get('accuracy', [])
-        accuracies = [acc*100 for _, acc in accuracy_data] if accuracy_data else [0.0]
-        
-        # Extract training times with fallback
-        training_data = metrics.get('training_times', [])
-        training_times = [time for _, time in training_data] if training_data else [0.0]
-        
-        # Ensure all arrays have the same length
-        max_length = max(len(losses), len(accuracies), len(training_times), 1)
-        
-        # Pad arrays to same length if needed
-        while len(losses) < max_length:
-            losses.append(losses[-1] if losses else 0.0)
-        while len(accuracies) < max_length:
-            accuracies.append(accuracies[-1] if accuracies else 0.0)
-        while len(training_times) < max_length:
-            training_times.append(training_times[-1] if training_times else 0.0)
-        
-        final_metrics = self.data.get('final_metrics', {})
-        metrics_values = [
-            final_metrics.get('accuracy', 0) * 100,
-            final_metrics.get('precision', 0) * 100,
-            final_metrics.get('recall', 0) * 100,
-            final_metrics.get('f1', 0) * 100,
-            final_metrics.get('specificity', 0) * 100,
-            final_metrics.get('balanced_accuracy', 0) * 100
-        ]
-        
-        rounds_labels = [f'Round {i+1}' for i in range(max_length)]
-        
-        return f"""
-    <script>
-        // DataTools4Heart color palette
-        const dt4hColors = {{
-            primary: '#ae0d1b',
-            secondary: '#8b0a15',
-            accent: '#d42434',
-            success: '#28a745',
-            warning: '#ffc107',
-            danger: '#dc3545'
-        }};
-
-        // Chart.js default configuration
-        Chart.defaults.font.family = 'Inter, sans-serif';
-        Chart.defaults.font.size = 12;
-        Chart.defaults.color = '#495057';
 
-        // Loss Chart
-        const lossCtx = document.getElementById('lossChart').getContext('2d');
-        new Chart(lossCtx, {{
+# Loss and accuracy share the same line chart, only the series and colour change
+_LINE_CHART_TEMPLATE = string.Template("""        // $title Chart
+        const ${name}Ctx = document.getElementById('${name}Chart').getContext('2d');
+        new Chart(${name}Ctx, {
             type: 'line',
-            data: {{
-                labels: {json.dumps(rounds_labels)},
-                datasets: [{{
-                    label: 'Training Loss',
-                    data: {json.dumps(losses)},
-                    borderColor: dt4hColors.primary,
-                    backgroundColor: dt4hColors.primary + '20',
+            data: {
+                labels: $labels,
+                datasets: [{
+                    label: '$label',
+                    data: $data,
+                    borderColor: dt4hColors.$color,
+                    backgroundColor: dt4hColors.$color + '20',
                     tension: 0.4,
                     fill: true,
                     borderWidth: 3,
-                    pointBackgroundColor: dt4hColors.primary,
+                    pointBackgroundColor: dt4hColors.$color,
                     pointBorderColor: '#ffffff',
                     pointBorderWidth: 2,
-                    pointRadius: 6,
+                    pointRadius: $point_radius,
                     pointHoverRadius: 8
-                }}]
-            }},
-            options: {{
-                responsive: true,
-                plugins: {{
-                    legend: {{
-                        labels: {{
-                            usePointStyle: true,
-                            font: {{
-                                weight: 600
-                            }}
-                        }}
-                    }}
-                }},
-                scales: {{
-                    y: {{
-                        beginAtZero: false,
-                        grid: {{
-                            color: '#e9ecef'
-                        }},
-                        ticks: {{
-                            color: '#6c757d'
-                        }}
-                    }},
-                    x: {{
-                        grid: {{
-                            color: '#e9ecef'
-                        }},
-                        ticks: {{
-                            color: '#6c757d'
-                        }}
-                    }}
-                }}
-            }}
-        }});
+                }]
+            },
+            options: {
+                ...dt4hBaseOptions,
+                spanGaps: true,
+                scales: {
+                    y: { ...dt4hAxis, beginAtZero: false },
+                    x: dt4hAxis
+                }
+            }
+        });
 
-        // Accuracy Chart
-        const accuracyCtx = document.getElementById('accuracyChart').getContext('2d');
-        new Chart(accuracyCtx, {{
-            type: 'line',
-            data: {{
-                labels: {json.dumps(rounds_labels)},
-                datasets: [{{
-                    label: 'Accuracy (%)',
-                    data: {json.dumps(accuracies)},
-                    borderColor: dt4hColors.success,
-                    backgroundColor: dt4hColors.success + '20',
-                    tension: 0.4,
-                    fill: true,
-                    borderWidth: 3,
-                    pointBackgroundColor: dt4hColors.success,
-                    pointBorderColor: '#ffffff',
-                    pointBorderWidth: 2,
-                    pointRadius: 6,
-                    pointHoverRadius: 8
-                }}]
-            }},
-            options: {{
-                responsive: true,
-                plugins: {{
-                    legend: {{
-                        labels: {{
-                            usePointStyle: true,
-                            font: {{
-                                weight: 600
-                            }}
-                        }}
-                    }}
-                }},
-                scales: {{
-                    y: {{
-                        beginAtZero: false,
-                        grid: {{
-                            color: '#e9ecef'
-                        }},
-                        ticks: {{
-                            color: '#6c757d'
-                        }}
-                    }},
-                    x: {{
-                        grid: {{
-                            color: '#e9ecef'
-                        }},
-                        ticks: {{
-                            color: '#6c757d'
-                        }}
-                    }}
-                }}
-            }}
-        }});
+""")
+
+# (title, canvas name, dataset label, series, palette colour) of each line chart
+_LINE_CHARTS = (
+    ('Loss', 'loss', 'Training Loss', 'losses', 'primary'),
+    ('Accuracy', 'accuracy', 'Accuracy (%)', 'accuracies', 'success'),
+)
 
-        // Training Time Chart
+_TIME_CHART_TEMPLATE = string.Template("""        // Training Time Chart
         const timeCtx = document.getElementById('timeChart').getContext('2d');
-        new Chart(timeCtx, {{
+        new Chart(timeCtx, {
             type: 'bar',
-            data: {{
-                labels: {json.dumps(rounds_labels)},
-                datasets: [{{
+            data: {
+                labels: $labels,
+                datasets: [{
                     label: 'Training Time (s)',
-                    data: {json.dumps(training_times)},
+                    data: $times,
                     backgroundColor: dt4hColors.accent + 'CC',
                     borderColor: dt4hColors.accent,
                     borderWidth: 2,
                     borderRadius: 6,
                     borderSkipped: false,
-                }}]
-            }},
-            options: {{
-                responsive: true,
-                plugins: {{
-                    legend: {{
-                        labels: {{
-                            usePointStyle: true,
-                            font: {{
-                                weight: 600
-                            }}
-                        }}
-                    }}
-                }},
-                scales: {{
-                    y: {{
-                        beginAtZero: true,
-                        grid: {{
-                            color: '#e9ecef'
-                        }},
-                        ticks: {{
-                            color: '#6c757d'
-                        }}
-                    }},
-                    x: {{
-                        grid: {{
-                            display: false
-                        }},
-                        ticks: {{
-                            color: '#6c757d'
-                        }}
-                    }}
-                }}
-            }}
-        }});
+                }]
+            },
+            options: {
+                ...dt4hBaseOptions,
+                scales: {
+                    y: { ...dt4hAxis, beginAtZero: true },
+                    x: { ...dt4hAxis, grid: { display: false } }
+                }
+            }
+        });
+
+""")
 
-        // Performance Metrics Chart (Final Round)
+_METRICS_CHART_TEMPLATE = string.Template("""        // Performance Metrics Chart (Final Round)
         const metricsCtx = document.getElementById('metricsChart').getContext('2d');
-        new Chart(metricsCtx, {{
+        new Chart(metricsCtx, {
             type: 'radar',
-            data: {{
+            data: {
                 labels: ['Accuracy', 'Precision', 'Recall', 'F1 Score', 'Specificity', 'Balanced Accuracy'],
-                datasets: [{{
+                datasets: [{
                     label: 'Performance Metrics (%)',
-                    data: {json.dumps(metrics_values)},
+                    data: $metrics_values,
                     borderColor: dt4hColors.primary,
                     backgroundColor: dt4hColors.primary + '30',
                     pointBackgroundColor: dt4hColors.primary,
@@ -1001,43 +873,208 @@ class HTMLReportGenerator:
                     pointRadius: 6,
                     pointHoverRadius: 8,
                     borderWidth: 3
-                }}]
-            }},
-            options: {{
-                responsive: true,
-                plugins: {{
-                    legend: {{
-                        labels: {{
-                            usePointStyle: true,
-                            font: {{
-                                weight: 600
-                            }}
-                        }}
-                    }}
-                }},
-                scales: {{
-                    r: {{
+                }]
+            },
+            options: {
+                ...dt4hBaseOptions,
+                scales: {
+                    r: {
                         beginAtZero: true,
                         max: 100,
-                        grid: {{
+                        grid: {
                             color: '#e9ecef'
-                        }},
-                        angleLines: {{
+                        },
+                        angleLines: {
                             color: '#e9ecef'
-                        }},
-                        pointLabels: {{
+                        },
+                        pointLabels: {
                             color: '#6c757d',
-                            font: {{
+                            font: {
                                 size: 11,
                                 weight: 600
-                            }}
-                        }},
-                        ticks: {{
+                            }
+                        },
+                        ticks: {
                             color: '#6c757d',
                             backdropColor: 'transparent'
-                        }}
-                    }}
-                }}
-            }}
-        }});
+                        }
+                    }
+                }
+            }
+        });""")
+
+_JS_TAIL = """
     </script>"""
+
+
+class HTMLReportGenerator:
+    """Generate HTML report from parsed FLCore logs"""
+    
+    def __init__(self, data: Dict):
+        self.data = data
+    
+    @functools.cached_property
+    def _fmt(self) -> Dict[str, str]:
+        """Header and basic_info values, formatted once for all the sections using them"""
+        info = self.data['basic_info']
+        return {
+            'date': datetime.now().strftime("%B %d, %Y"),
+            'rounds': str(info['rounds']),
+            'clients': str(info['clients']),
+            'duration': f"{info['duration']:.2f}",
+            'final_loss': f"{info['final_loss']:.4f}",
+            'final_accuracy': f"{info['final_accuracy']:.2f}"
+        }
+    
+    def generate_html(self, output_file: str = 'flwr_report.html', compress: bool = False) -> str:
+        """
+        Generate the complete HTML report and return the path written.
+        With compress, the report is gzipped (fast level) to output_file + '.gz',
+        the embedded chart data of long runs shrinks several times.
+        """
+        # Sections are written as they are generated, never joined into one string
+        if compress:
+            output_file += '.gz'
+            with gzip.open(output_file, 'wt', compresslevel=1, encoding='utf-8') as f:
+                f.writelines(self._generate_html_parts())
+        else:
+            with open(output_file, 'w', encoding='utf-8', buffering=1 << 20) as f:
+                f.writelines(self._generate_html_parts())
+        
+        logger.info("✅ Report generated successfully: {}", output_file)
+        return output_file
+    
+    def _generate_html_parts(self):
+        """Yield the complete HTML structure, one section at a time"""
+        indent = '\n        '
+        yield _HTML_HEAD
+        yield _CSS
+        yield '\n</head>\n<body>\n    <div class="container">'
+        yield indent
+        yield self._generate_header()
+        yield indent
+        yield self._generate_summary_cards()
+        yield indent
+        yield _PROGRESS_HTML
+        yield indent
+        yield _CHARTS_HTML
+        yield indent
+        yield self._generate_client_info()
+        yield indent
+        yield self._generate_metrics_table()
+        yield indent
+        yield self._generate_logs_section()
+        yield indent
+        yield self._generate_insights()
+        yield '\n    </div>\n    \n'
+        yield _FOOTER_HTML
+        yield '\n    \n    '
+        yield from self._generate_chart_chunks()
+        yield '\n</body>\n</html>'
+    
+    def _generate_header(self) -> str:
+        """Generate header section"""
+        return _HEADER_TMPL.format_map(self._fmt)
+    
+    def _generate_summary_cards(self) -> str:
+        """Generate summary cards section"""
+        return _SUMMARY_TMPL.format_map(self._fmt)
+    
+    def _generate_client_info(self) -> str:
+        """Generate client information section"""
+        client_parts = []
+        for i, client in enumerate(self.data['clients'], 1):
+            client_type = "Docker Network Client" if "172.17.0.1" in client else "External Network Client"
+            client_parts.append(_CLIENT_CARD_TMPL.format(
+                index=i, address=client.replace('ipv4:', ''), client_type=client_type
+            ))
+        
+        return _CLIENT_INFO_TMPL.format(clients_html=''.join(client_parts))
+    
+    def _generate_metrics_table(self) -> str:
+        """Generate metrics table"""
+        row_parts = []
+        metrics = self.data['metrics']
+        
+        # Combine data by the logged round numbers, missing values show as 0
+        rounds_data = {}
+        for round_num, loss in metrics['losses']:
+            rounds_data[round_num] = {'loss': loss}
+        for metric, values in metrics['eval_metrics'].items():
+            for round_num, value in values:
+                rounds_data.setdefault(round_num, {})[metric] = value
+        for round_num, training_time in metrics['training_times']:
+            if round_num in rounds_data:
+                rounds_data[round_num]['training_time'] = training_time
+        
+        append = row_parts.append
+        for round_num in sorted(rounds_data):
+            data = rounds_data[round_num]
+            loss, accuracy, precision, recall, f1, training_time = (data.get(field, 0) for field in _TABLE_FIELDS)
+            append(_METRICS_ROW_TMPL.format(
+                round_num=round_num, loss=loss, accuracy=accuracy*100, precision=precision*100,
+                recall=recall*100, f1=f1*100, training_time=training_time
+            ))
+        
+        return _METRICS_TABLE_TMPL.format(rows=''.join(row_parts))
+    
+    def _generate_logs_section(self) -> str:
+        """Generate logs section"""
+        log_parts = []
+        
+        # Show first 10 and last 5 log entries
+        logs = self.data['logs']
+        for log in logs[:10] + logs[-5:]:
+            level_class = _LEVEL_CLASS.get(log['level'], 'log-info')
+            log_parts.append(_LOG_ENTRY_TMPL.format(level_class=level_class, **log))
+        
+        return _LOGS_SECTION_TMPL.format(log_entries=''.join(log_parts))
+    
+    def _generate_insights(self) -> str:
+        """Generate insights section"""
+        return _INSIGHTS_TMPL.format_map(self._fmt)
+    
+    def _generate_chart_chunks(self):
+        """Yield the chart JavaScript one chart at a time"""
+        # Prepare data for JavaScript with safety checks
+        metrics = self.data.get('metrics', {})
+        
+        # Extract losses with fallback
+        losses_data = metrics.get('losses', [])
+        losses = _values(losses_data) if losses_data else [0.0]
+        
+        # Extract accuracies with fallback
+        eval_metrics = metrics.get('eval_metrics', {})
+        accuracy_data = eval_metrics.get('accuracy', [])
+        accuracies = [acc*100 for _, acc in accuracy_data] if accuracy_data else [0.0]
+        
+        # Extract training times with fallback
+        training_data = metrics.get('training_times', [])
+        training_times = _values(training_data) if training_data else [0.0]
+        
+        # Ensure all arrays have the same length
+        max_length = max(len(losses), len(accuracies), len(training_times), 1)
+        
+        # Pad arrays to same length if needed
+        losses = _pad_edge(losses, max_length)
+        accuracies = _pad_edge(accuracies, max_length)
+        training_times = _pad_edge(training_times, max_length)
+        
+        final_metrics = self.data.get('final_metrics', {})
+        metrics_values = [final_metrics.get(metric, 0) * 100 for metric in _EVAL_METRICS]
+        
+        series_json = {'losses': _series_json(losses), 'accuracies': _series_json(accuracies)}
+        # Markers only help while they can be told apart, dense runs draw just the line
+        point_radius = 6 if max_length <= _MAX_MARKED_POINTS else 0
+        
+        yield _JS_HEAD
+        for title, name, label, series, color in _LINE_CHARTS:
+            labels_json, data_json = series_json[series]
+            yield _LINE_CHART_TEMPLATE.substitute(
+                title=title, name=name, labels=labels_json, label=label,
+                data=data_json, color=color, point_radius=point_radius
+            )
+        labels_json, times_json = _series_json(training_times)
+        yield _TIME_CHART_TEMPLATE.substitute(labels=labels_json, times=times_json)
+        yield _METRICS_CHART_TEMPLATE.substitute(metrics_values=_to_json(metrics_values))
+        yield _JS_TAIL